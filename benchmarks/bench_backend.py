@@ -0,0 +1,73 @@
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "build"))
+
+import basic
+
+def make_script(lines):
+   chunks = ["save total as 0\n", "save label as \"total\"\n"]
+
+   for i in range(lines):
+      chunks.append(f"save total as total + {i} * 2 - (total / 3) ^ 0.5\n")
+      chunks.append(f"save label as \"step \" + {i} + \" \" * 2\n")
+      chunks.append(f"print(label, total)\n")
+
+   return "".join(chunks)
+
+def parse(text):
+   tokens, error = basic.FastLexer("<bench>", text).make_tokens()
+   assert error is None
+
+   ast = basic.Parser(tokens).parse()
+   assert ast.error is None
+
+   return ast.node
+
+def new_context():
+   context = basic.Context("<Program>")
+   context.symbol_table = basic.SymbolTable()
+   context.symbol_table.set("null", basic.Number(0))
+   return context
+
+def timed(function):
+   output = io.StringIO()
+   start = time.perf_counter()
+
+   with contextlib.redirect_stdout(output):
+      function()
+
+   return time.perf_counter() - start, output.getvalue()
+
+def bench(lines, repeat=3):
+   node = parse(make_script(lines))
+   interpreter = basic.Interpreter()
+   compiler = basic.Compiler()
+
+   interpreted, compiled, compile_time = [], [], []
+   expected = None
+
+   for _ in range(repeat):
+      elapsed, output = timed(lambda: interpreter.visit(node, new_context()))
+      interpreted.append(elapsed)
+      expected = output
+
+      start = time.perf_counter()
+      program = compiler.compile(node)
+      compile_time.append(time.perf_counter() - start)
+
+      elapsed, output = timed(lambda: program(new_context()))
+      compiled.append(elapsed)
+      assert output == expected
+
+   old, new, build = min(interpreted), min(compiled), min(compile_time)
+   print(f"{lines * 3:>7} statements | Interpreter {old * 1000:8.1f} ms | compile {build * 1000:7.1f} ms + run {new * 1000:8.1f} ms | run {old / new:4.2f}x, total {old / (build + new):4.2f}x")
+
+if __name__ == "__main__":
+   sys.setrecursionlimit(10000)
+
+   for lines in (1000, 10000, 50000):
+      bench(lines)
@@ -0,0 +1,62 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BUILD = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "build")
+sys.path.insert(0, BUILD)
+
+import basic
+
+def make_script(index, lines):
+   chunks = [f"save total as {index}\n"]
+
+   for i in range(lines):
+      chunks.append(f"save total as total + {i} * (2 - {i % 7}) ^ 2\n")
+      chunks.append(f"print(\"script\", {index}, \"line\", {i}, total / 4)\n")
+
+   return "".join(chunks)
+
+def separate_processes(files):
+   # What running every script with its own `su` costs today
+   start = time.perf_counter()
+
+   for name in files:
+      subprocess.run([sys.executable, os.path.join(BUILD, "sunolang.py"), name, "--no-cache"], stdout=subprocess.DEVNULL, check=True)
+
+   return time.perf_counter() - start
+
+def batch(folder, jobs):
+   start = time.perf_counter()
+   results = list(basic.run_batch([folder], jobs=jobs, cache=False))
+   elapsed = time.perf_counter() - start
+
+   assert all(result.error is None for result in results)
+   return elapsed, [(result.name, result.output) for result in results]
+
+if __name__ == "__main__":
+   scripts, lines = 400, 50
+
+   with tempfile.TemporaryDirectory() as folder:
+      for index in range(scripts):
+         with open(os.path.join(folder, f"script_{index:04}.su"), "w") as file:
+            file.write(make_script(index, lines))
+
+      files = basic.batch_files([folder])
+
+      sample = files[:40]
+      per_file = separate_processes(sample) / len(sample)
+      print(f"{'su per file':>14} | {per_file * scripts:8.2f} s | {1 / per_file:8.1f} files/s (estimated from {len(sample)} files)")
+
+      expected = None
+      cores = os.cpu_count() or 1
+
+      for jobs in sorted({1, 2, 4, cores}):
+         elapsed, outputs = batch(folder, jobs)
+
+         if expected is None:
+            expected = outputs
+
+         assert outputs == expected, "batch output changed with the number of workers"
+         print(f"{f'batch -j {jobs}':>14} | {elapsed:8.2f} s | {scripts / elapsed:8.1f} files/s")
@@ -0,0 +1,66 @@
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "build"))
+
+import basic
+
+def make_script(lines):
+   chunks = []
+
+   for i in range(lines):
+      chunks.append(f"save value_{i} as {i} + {i}.5 * (2 - value_{max(i - 1, 0)}) ^ 2\n")
+      chunks.append(f"print(\"line\", {i}, value_{i} / 4) // comment {i}\n")
+
+   return "".join(chunks)
+
+def startup(name, cache):
+   start = time.perf_counter()
+
+   with open(name, "r") as file:
+      text = file.read()
+
+   stats = {}
+   node, error = basic.load_program(name, text, cache=cache, stats=stats)
+   assert error is None
+
+   return time.perf_counter() - start, stats.get("cache")
+
+def bench(folder, lines, repeat=3):
+   name = os.path.join(folder, f"bench_{lines}.su")
+
+   with open(name, "w") as file:
+      file.write(make_script(lines))
+
+   size = os.path.getsize(name) / 1024
+
+   uncached = min(startup(name, False)[0] for _ in range(repeat))
+
+   writes = []
+
+   for _ in range(repeat):
+      if os.path.exists(basic.cache_path(name)):
+         os.remove(basic.cache_path(name))
+
+      elapsed, status = startup(name, True)
+      assert status == "miss"
+      writes.append(elapsed)
+
+   hits = []
+
+   for _ in range(repeat):
+      elapsed, status = startup(name, True)
+      assert status == "hit"
+      hits.append(elapsed)
+
+   cold, warm = min(writes), min(hits)
+   print(f"{size:8.0f} KB | no cache {uncached * 1000:8.1f} ms | cold (miss + write) {cold * 1000:8.1f} ms | warm (hit) {warm * 1000:8.1f} ms | {uncached / warm:5.2f}x")
+
+if __name__ == "__main__":
+   sys.setrecursionlimit(10000)
+
+   with tempfile.TemporaryDirectory() as folder:
+      for lines in (1000, 10000, 50000):
+         bench(folder, lines)
@@ -0,0 +1,49 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "build"))
+
+import basic
+
+# Builds a big generated script out of the kind of lines our generators spit out
+
+def make_script(lines):
+   chunks = []
+
+   for i in range(lines):
+      chunks.append(f"save value_{i} as {i} + {i}.5 * (2 - 3) ^ 2 // number {i}\n")
+      chunks.append(f"save text_{i} as \"line\\t{i}\" .. 'quoted' + value_{i}\n")
+      chunks.append(f"/* block {i}\n   spans lines */ print(text_{i}, value_{i})\n")
+
+   return "".join(chunks)
+
+def best_of(repeat, function):
+   best = None
+
+   for _ in range(repeat):
+      start = time.perf_counter()
+      function()
+      elapsed = time.perf_counter() - start
+      best = elapsed if best is None else min(best, elapsed)
+
+   return best
+
+def bench(lines, repeat=3):
+   text = make_script(lines)
+   size = len(text) / (1024 * 1024)
+
+   old_tokens, old_error = basic.Lexer("<bench>", text).make_tokens()
+   new_tokens, new_error = basic.FastLexer("<bench>", text).make_tokens()
+
+   assert old_error is None and new_error is None
+   assert [(t.type, t.value) for t in old_tokens] == [(t.type, t.value) for t in new_tokens]
+
+   old = best_of(repeat, lambda: basic.Lexer("<bench>", text).make_tokens())
+   new = best_of(repeat, lambda: basic.FastLexer("<bench>", text).make_tokens())
+
+   print(f"{size:6.2f} MB, {len(new_tokens):>8} tokens | Lexer {size / old:6.2f} MB/s | FastLexer {size / new:6.2f} MB/s | {old / new:5.2f}x")
+
+if __name__ == "__main__":
+   for lines in (1000, 10000, 40000):
+      bench(lines)
@@ -0,0 +1,63 @@
+import contextlib
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "build"))
+
+import basic
+
+# Each loop adds 24 tokens, so lines=42000 gives about a million
+
+def make_script(lines):
+   chunks = ["save value as 0\n"]
+
+   for i in range(lines):
+      chunks.append(f"save value_{i % 7} as {i} + (value * 2) - 3.5 ^ 2\n")
+      chunks.append(f"print(\"line\", value_{i % 7}, 'x' + {i})\n")
+
+   return "".join(chunks)
+
+class Discard(io.TextIOBase):
+   def write(self, text):
+      return len(text)
+
+def pipeline(lexer_class, text):
+   tokens, error = lexer_class("<bench>", text).make_tokens()
+   assert error is None
+
+   ast = basic.Parser(tokens).parse()
+   assert ast.error is None
+
+   context = basic.Context("<Program>")
+   context.symbol_table = basic.SymbolTable()
+   context.symbol_table.set("null", basic.Number(0))
+
+   with contextlib.redirect_stdout(Discard()):
+      result = basic.Interpreter().visit(ast.node, context)
+
+   assert result.error is None
+   return len(tokens)
+
+def measure(lexer_class, text):
+   tracemalloc.start()
+   start = time.perf_counter()
+
+   count = pipeline(lexer_class, text)
+
+   elapsed = time.perf_counter() - start
+   peak = tracemalloc.get_traced_memory()[1]
+   tracemalloc.stop()
+
+   return count, peak, elapsed
+
+if __name__ == "__main__":
+   sys.setrecursionlimit(10000)
+   lines = int(sys.argv[1]) if len(sys.argv) > 1 else 42000
+   text = make_script(lines)
+
+   for lexer_class in (basic.Lexer, basic.FastLexer):
+      count, peak, elapsed = measure(lexer_class, text)
+      print(f"{lexer_class.__name__:>9} | {count:>8} tokens | peak {peak / (1024 * 1024):7.1f} MB | {peak / count:6.1f} bytes/token | {elapsed:6.1f} s")
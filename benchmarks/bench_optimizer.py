@@ -0,0 +1,75 @@
+import io
+import os
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "build"))
+
+import basic
+
+def execute(text, backend, optimize, name="<bench>", cache=False):
+   basic.global_symbol_table = basic.new_symbol_table()
+   output = io.StringIO()
+   stats = {}
+
+   start = time.perf_counter()
+
+   with redirect_stdout(output):
+      result, error = basic.run(name, text, backend=backend, optimize=optimize, cache=cache, stats=stats)
+
+   elapsed = time.perf_counter() - start
+   error = error and (error.as_string(), error.start.index, error.end.index)
+
+   return elapsed, output.getvalue(), error, stats.get("folded_nodes")
+
+def check():
+   # The pass has to actually fold, and whatever it skips has to fail exactly like before
+   for backend in basic.BACKENDS:
+      elapsed, output, error, folded = execute("print(2 + 2 * 3 ^ 2)", backend, True)
+      assert folded == 6, f"expected 6 folded nodes, got {folded}"
+      assert (output, error) == execute("print(2 + 2 * 3 ^ 2)", backend, False)[1:3]
+
+      text = "save x as 1\nprint(1 / (2 - 2))\n"
+      elapsed, output, error, folded = execute(text, backend, True)
+      assert folded == 2, f"expected only (2 - 2) to fold, got {folded}"
+      assert error is not None and "line 2" in error[0]
+      assert (output, error) == execute(text, backend, False)[1:3]
+
+def literal_script(lines):
+   chunks = ["save value_0 as 0\n"]
+
+   for i in range(1, lines):
+      chunks.append(f"save value_{i} as ({i} + 2 * 3 ^ 2 - 8 / 4) * (1 + 1) + value_{i - 1}\n")
+      chunks.append(f"print(\"line \" + {i}, {i} * 1.5 - 3)\n")
+
+   return "".join(chunks)
+
+def cached(folder, text, backend, optimize, repeat):
+   # Warm runs only, the first one writes the cache (the optimizer flag is part of its header)
+   name = os.path.join(folder, f"bench_{int(optimize)}.su")
+   execute(text, backend, optimize, name, True)
+
+   return min(execute(text, backend, optimize, name, True) for _ in range(repeat))
+
+def bench(folder, lines, backend, repeat=3):
+   text = literal_script(lines)
+
+   plain = min(execute(text, backend, False) for _ in range(repeat))
+   folded = min(execute(text, backend, True) for _ in range(repeat))
+   plain_cached = cached(folder, text, backend, False, repeat)
+   folded_cached = cached(folder, text, backend, True, repeat)
+
+   assert plain[1:3] == folded[1:3] == plain_cached[1:3] == folded_cached[1:3], "optimized output differs"
+
+   print(f"{lines:8} lines | {backend:>11} | no optimize {plain[0] * 1000:8.1f} ms | optimize {folded[0] * 1000:8.1f} ms | "
+      f"cached: no optimize {plain_cached[0] * 1000:8.1f} ms | optimize {folded_cached[0] * 1000:8.1f} ms | {folded[3]:7} nodes folded")
+
+if __name__ == "__main__":
+   check()
+
+   with tempfile.TemporaryDirectory() as folder:
+      for backend in basic.BACKENDS:
+         for lines in (1000, 10000):
+            bench(folder, lines, backend)
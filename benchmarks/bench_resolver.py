@@ -0,0 +1,74 @@
+import io
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "build"))
+
+import basic
+
+def variables_script(lines, names=200):
+   chunks = [f"save v_{i} as {i}\n" for i in range(names)]
+
+   for i in range(lines):
+      chunks.append(f"save v_{i % names} as v_{(i * 7) % names} + v_{(i * 13) % names} * 2 - v_{(i * 31) % names} / 4\n")
+
+      if i % 100 == 0:
+         chunks.append(f"print(v_{i % names}, v_{(i * 3) % names})\n")
+
+   return "".join(chunks)
+
+def chain_script(terms):
+   return f"save a as 1\nsave b as 2\nprint({' + '.join('a' if i % 2 else 'b' for i in range(terms))})\n"
+
+def execute(node, backend):
+   # Only times getting the tree ready for the backend and running it, lexing and parsing are the same for all of them
+   context = basic.make_context(None, basic.new_symbol_table())
+   output = io.StringIO()
+
+   start = time.perf_counter()
+
+   try:
+      with redirect_stdout(output):
+         if backend == "compiled":
+            value, error = basic.Compiler().compile(node)(context)
+         elif backend == "stack":
+            resolver = basic.Resolver()
+            code, stored = resolver.resolve(node)
+            value, error = basic.StackEvaluator(resolver, context).execute(code, stored)
+         else:
+            error = basic.Interpreter().visit(node, context).error
+   except RecursionError:
+      return None, None
+
+   elapsed = time.perf_counter() - start
+   assert error is None
+
+   return elapsed, output.getvalue()
+
+def bench(label, text, repeat=3):
+   node, error = basic.load_program("<bench>", text)
+   assert error is None
+
+   timings = {}
+   expected = None
+
+   for backend in basic.BACKENDS:
+      elapsed, output = min((execute(node, backend) for _ in range(repeat)), key=lambda run: run[0] or 0)
+
+      if output is not None:
+         expected = output if expected is None else expected
+         assert output == expected, f"{backend} output differs"
+
+      timings[backend] = "recursion limit" if elapsed is None else f"{elapsed * 1000:8.1f} ms"
+
+   print(f"{label:>20} | " + " | ".join(f"{backend} {timing:>15}" for backend, timing in timings.items()))
+
+if __name__ == "__main__":
+   for lines in (10000, 50000):
+      bench(f"variables {lines}", variables_script(lines))
+
+   # Default recursion limit, the tree walking backends give up somewhere in here
+   for terms in (200, 2000, 20000, 200000):
+      bench(f"chain {terms}", chain_script(terms))
@@ -0,0 +1,76 @@
+import contextlib
+import hashlib
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "build"))
+
+import basic
+
+def write_script(name, lines):
+   with open(name, "w") as file:
+      for i in range(lines):
+         file.write(f"save value as {i} * 2 + (3 - 1) ^ 2 // line {i}\n")
+         file.write(f"/* block {i}\n   comment */ print(\"value\", value, 'text' + {i})\n")
+
+# Hashes output instead of keeping it, so the captured output doesn't show up in the memory peak
+
+class FirstOutput(io.TextIOBase):
+   def __init__(self):
+      super().__init__()
+      self.first = None
+      self.digest = hashlib.sha256()
+
+   def write(self, text):
+      if self.first is None:
+         self.first = time.perf_counter()
+
+      self.digest.update(text.encode())
+      return len(text)
+
+def measure(function):
+   basic.global_symbol_table.symbols = {"null": basic.Number(0)}
+   output = FirstOutput()
+
+   tracemalloc.start()
+   start = time.perf_counter()
+
+   with contextlib.redirect_stdout(output):
+      value, error = function()
+
+   elapsed = time.perf_counter() - start
+   peak = tracemalloc.get_traced_memory()[1]
+   tracemalloc.stop()
+
+   assert error is None
+   return peak / (1024 * 1024), output.first - start, elapsed, output.digest.hexdigest()
+
+def whole(name):
+   with open(name, "r") as file:
+      return basic.run(name, file.read())
+
+def streamed(name):
+   with open(name, "r") as file:
+      return basic.run_stream(name, file)
+
+def bench(folder, lines):
+   name = os.path.join(folder, f"bench_{lines}.su")
+   write_script(name, lines)
+   size = os.path.getsize(name) / (1024 * 1024)
+
+   old_peak, old_first, old_total, old_output = measure(lambda: whole(name))
+   new_peak, new_first, new_total, new_output = measure(lambda: streamed(name))
+   assert old_output == new_output
+
+   print(f"{size:6.2f} MB | whole file peak {old_peak:7.1f} MB, first output {old_first:6.2f} s, total {old_total:6.2f} s | stream peak {new_peak:5.1f} MB, first output {new_first:6.3f} s, total {new_total:6.2f} s")
+
+if __name__ == "__main__":
+   sys.setrecursionlimit(10000)
+
+   with tempfile.TemporaryDirectory() as folder:
+      for lines in (1000, 5000, 20000):
+         bench(folder, lines)
@@ -0,0 +1,61 @@
+import io
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "build"))
+
+import basic
+
+def accumulate_script(lines):
+   chunks = ["save s as \"\"\n"]
+
+   for i in range(lines):
+      chunks.append(f"save s as s + \"line {i} of the log, \" + {i}\n")
+
+   chunks.append("print(s)\n")
+   return "".join(chunks)
+
+def chain_script(terms):
+   # A variable in the chain keeps the optimizer from folding it away
+   parts = " + ".join(f"\"chunk {i} \" + x" for i in range(terms))
+   return f"save x as \"-\"\nprint({parts})\n"
+
+def execute(text, backend, threshold):
+   basic.ROPE_THRESHOLD = threshold
+   basic.global_symbol_table.symbols = {"null": basic.SMALL_NUMBERS[0]}
+   output = io.StringIO()
+
+   start = time.perf_counter()
+
+   with redirect_stdout(output):
+      result, error = basic.run("<bench>", text, backend=backend)
+
+   elapsed = time.perf_counter() - start
+   assert error is None
+
+   return elapsed, output.getvalue()
+
+def bench(label, text, backend, repeat=3):
+   default = basic.ROPE_THRESHOLD
+
+   try:
+      eager = min(execute(text, backend, float("inf")) for _ in range(repeat))
+      rope = min(execute(text, backend, default) for _ in range(repeat))
+   finally:
+      basic.ROPE_THRESHOLD = default
+
+   assert eager[1] == rope[1], "rope output differs from eager concatenation"
+
+   print(f"{label:>22} | {backend:>11} | {len(rope[1]) / 1024:8.0f} KB out | eager {eager[0] * 1000:8.1f} ms | rope {rope[0] * 1000:8.1f} ms | {eager[0] / rope[0]:5.2f}x")
+
+if __name__ == "__main__":
+   sys.setrecursionlimit(100000)
+
+   for backend in basic.BACKENDS:
+      for lines in (5000, 10000, 20000, 40000):
+         bench(f"accumulate {lines}", accumulate_script(lines), backend)
+
+      for terms in (1000, 2000, 4000, 8000):
+         bench(f"chain {terms}", chain_script(terms), backend)
@@ -1,4 +1,18 @@
+import gc
+import hashlib
+import io
+import json
+import marshal
+import os
+import re
 import string
+import sys
+from array import array
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext, redirect_stdout
+from sys import intern
+from time import perf_counter
 
 def strings(text, start, end):
    result = ""
@@ -30,6 +44,19 @@ def strings(text, start, end):
 
    return result
 
+# Building a big tree only creates long-lived objects, so the cycle collector would keep rescanning them for nothing
+
+@contextmanager
+def paused_gc():
+   collecting = gc.isenabled()
+   gc.disable()
+
+   try:
+      yield
+   finally:
+      if collecting:
+         gc.enable()
+
 DIGITS = "0123456789" # Create a list of digits so we can detect if a character is a digit
 LETTERS = string.ascii_letters
 MIXED = LETTERS + DIGITS
@@ -86,6 +113,8 @@ class RuntimeResult:
 ## Position
 
 class Position:
+   __slots__ = ("index", "line", "column", "name", "text")
+
    def __init__(self, index, line_number, column, name, file_text):
       self.index = index
       self.line = line_number
@@ -106,6 +135,50 @@ class Position:
    def copy(self):
       return Position(self.index, self.line, self.column, self.name, self.text)
 
+## Source
+
+# Shared metadata for one source file, turns plain offsets back into positions on demand
+
+def line_starts(text):
+   return [0] + [match.end() for match in re.finditer("\n", text)]
+
+class Source:
+   __slots__ = ("name", "text", "line_starts")
+
+   def __init__(self, name, text):
+      self.name = name
+      self.text = text
+      self.line_starts = None
+
+   def position(self, index):
+      if self.line_starts is None:
+         self.line_starts = line_starts(self.text)
+
+      line = bisect_right(self.line_starts, index) - 1
+      return Position(index, line, index - self.line_starts[line], self.name, self.text)
+
+# A piece of a streamed file, offsets stay absolute but only the line table is kept, not the text
+
+class SourceSegment(Source):
+   __slots__ = ("offset", "line", "column")
+
+   def __init__(self, name, text, offset, line, column):
+      super().__init__(name, None)
+      self.line_starts = array("l", line_starts(text))
+      self.offset = offset
+      self.line = line
+      self.column = column
+
+   def position(self, index):
+      position = super().position(index - self.offset)
+
+      if position.line == 0:
+         position.column += self.column
+
+      position.index = index
+      position.line += self.line
+      return position
+
 # TT = Token Type
 
 TT_INT = "TT_INT"
@@ -145,18 +218,10 @@ KEYWORDS = [
    "print"
 ]
  
-class Token:
-   def __init__(self, type_, value=None, start=None, end=None):
-      self.type = type_
-      self.value = value
+# Shared by both token kinds, Token keeps full positions while FastToken only keeps offsets
 
-      if start:
-         self.start = start.copy()
-         self.end = start.copy()
-         self.end.advance()
-
-      if end:
-         self.end = end
+class BaseToken:
+   __slots__ = ("type", "value")
 
    def matches(self, type_, value):
       return self.type == type_ and self.value == value
@@ -169,6 +234,23 @@ class Token:
    def __str__(self):
       return self.__repr__()
 
+class Token(BaseToken):
+   __slots__ = ("start", "end")
+
+   def __init__(self, type_, value=None, start=None, end=None):
+      self.type = type_
+      self.value = value
+      self.start = None
+      self.end = None
+
+      if start:
+         self.start = start.copy()
+         self.end = start.copy()
+         self.end.advance()
+
+      if end:
+         self.end = end.copy()
+
 ## Lexer
 
 class Lexer:
@@ -187,7 +269,7 @@ class Lexer:
       tokens = []
 
       while self.current_char is not None:
-         if self.current_char == "/":
+         if self.current_char == "/" and self.peek() in ("/", "*"):
             self.skip_comment()
          elif self.current_char in " \t":
             self.advance()
@@ -196,7 +278,12 @@ class Lexer:
          elif self.current_char in LETTERS:
             tokens.append(self.make_identifier())
          elif self.current_char in ['"', "'"]:
-            tokens.append(self.make_string())
+            token, error = self.make_string()
+
+            if error:
+               return [], error
+
+            tokens.append(token)
          elif self.current_char == "+":
             tokens.append(Token(TT_PLUS, start=self.pos))
             self.advance()
@@ -290,7 +377,7 @@ class Lexer:
 
       if self.current_char == quote_type:
          self.advance()
-         return Token(TT_STRING, string, start_pos, self.pos)
+         return Token(TT_STRING, string, start_pos, self.pos), None
       
       return None, ExpectedCharacter(start_pos, self.pos, f"Expected closing {quote_type}")
 
@@ -347,77 +434,380 @@ class Lexer:
 
       return Token(token_type, start=start, end=self.pos)
 
+## Fast Lexer
+
+# Same tokens as Lexer, but whole runs are matched at once and positions are only built when asked for
+
+class FastToken(BaseToken):
+   # Keeping the length instead of the end offset means a small cached int for almost every token
+   __slots__ = ("source", "start_index", "length")
+
+   def __init__(self, type_, value, source, start_index, end_index):
+      self.type = type_
+      self.value = value
+      self.source = source
+      self.start_index = start_index
+      self.length = end_index - start_index
+
+   @property
+   def end_index(self):
+      return self.start_index + self.length
+
+   @property
+   def start(self):
+      return self.source.position(self.start_index)
+
+   @property
+   def end(self):
+      return self.source.position(self.start_index + self.length)
+
+TOKEN_PATTERN = re.compile(r"""
+   (?P<SKIP>[ \t\n]+)
+ | (?P<COMMENT>//[^\n]*|/\*(?:/|.*?\*/|.*))
+ | (?P<NUMBER>[0-9]+(?P<FRACTION>\.[0-9]*)?)
+ | (?P<IDENTIFIER>[A-Za-z][A-Za-z0-9_]*)
+ | (?P<STRING>"[^"\\]*(?:\\.[^"\\]*)*"|'[^'\\]*(?:\\.[^'\\]*)*')
+ | (?P<UNCLOSED>["'])
+ | (?P<CONCAT>\.\.)
+ | (?P<DOT>\.)
+ | (?P<OPERATOR>[-+*/()^,])
+ | (?P<ILLEGAL>.)
+""", re.VERBOSE | re.DOTALL)
+
+ESCAPE_PATTERN = re.compile(r"\\(.)", re.DOTALL)
+ESCAPE_CHARACTERS = {"n": "\n", "t": "\t"}
+
+OPERATORS = {
+   "+": TT_PLUS,
+   "-": TT_MINUS,
+   "*": TT_MUL,
+   "/": TT_DIV,
+   "(": TT_LPAREN,
+   ")": TT_RPAREN,
+   "^": TT_POW,
+   ",": TT_COMMA
+}
+
+KEYWORD_SET = frozenset(KEYWORDS)
+
+def unescape(match):
+   char = match.group(1)
+   return ESCAPE_CHARACTERS.get(char, char)
+
+class FastLexer:
+   def __init__(self, name, text):
+      self.text = text
+      self.name = name
+      self.source = Source(name, text)
+
+   def make_tokens(self):
+      tokens = []
+      append = tokens.append
+      source = self.source
+
+      for match in TOKEN_PATTERN.finditer(self.text):
+         kind = match.lastgroup
+         start, end = match.span()
+
+         if kind == "SKIP" or kind == "COMMENT" or kind == "DOT":
+            continue
+         elif kind == "IDENTIFIER":
+            word = intern(match.group())
+            append(FastToken(TT_KEYWORD if word in KEYWORD_SET else TT_IDENTIFIER, word, source, start, end))
+         elif kind == "OPERATOR":
+            append(FastToken(OPERATORS[match.group()], None, source, start, end))
+         elif kind == "NUMBER" or kind == "FRACTION":
+            if match.group("FRACTION") is None:
+               append(FastToken(TT_INT, int(match.group()), source, start, end))
+            else:
+               append(FastToken(TT_FLOAT, float(match.group()), source, start, end))
+         elif kind == "STRING":
+            value = self.text[start + 1:end - 1]
+
+            if "\\" in value:
+               value = ESCAPE_PATTERN.sub(unescape, value)
+
+            append(FastToken(TT_STRING, value, source, start, end))
+         elif kind == "CONCAT":
+            append(FastToken(TT_CONCAT, None, source, start, end))
+         elif kind == "UNCLOSED":
+            return [], ExpectedCharacter(source.position(start), source.position(len(self.text)), f"Expected closing {match.group()}")
+         else:
+            return [], IllegalCharacter(source.position(start), source.position(end), "\"" + match.group() + "\"")
+
+      end = len(self.text)
+      tokens.append(FastToken(TT_EOF, None, source, end, end + 1))
+      return tokens, None
+
+## Stream Lexer
+
+# Reads the file a chunk at a time and yields tokens as soon as they're complete
+# A match touching the end of the buffer might keep going in the next chunk, so it waits for more text first
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+class StreamLexer:
+   def __init__(self, name, file, chunk_size=STREAM_CHUNK_SIZE):
+      self.name = name
+      self.file = file
+      self.chunk_size = chunk_size
+      self.error = None
+
+   def tokens(self):
+      buffer = ""
+      index = 0 # Where scanning picks up inside the buffer
+      offset, line, column = 0, 0, 0 # Where the buffer starts in the file
+      finished = False
+      source = SourceSegment(self.name, buffer, offset, line, column)
+
+      while True:
+         match = TOKEN_PATTERN.match(buffer, index)
+
+         if match is None or (not finished and (match.end() == len(buffer) or match.lastgroup == "UNCLOSED")):
+            if finished:
+               break
+
+            # Forget everything already scanned, then read at least as much as what's left so long tokens stay linear
+            scanned = buffer[:index]
+            newlines = scanned.count("\n")
+
+            if newlines:
+               line += newlines
+               column = len(scanned) - scanned.rfind("\n") - 1
+            else:
+               column += len(scanned)
+
+            offset += index
+            chunk = self.file.read(max(self.chunk_size, len(buffer) - index))
+            finished = not chunk
+            buffer = buffer[index:] + chunk
+            index = 0
+            source = SourceSegment(self.name, buffer, offset, line, column)
+            continue
+
+         kind = match.lastgroup
+         start, end = match.span()
+         index = end
+
+         if kind == "SKIP" or kind == "COMMENT" or kind == "DOT":
+            continue
+         elif kind == "IDENTIFIER":
+            word = intern(match.group())
+            yield FastToken(TT_KEYWORD if word in KEYWORD_SET else TT_IDENTIFIER, word, source, offset + start, offset + end)
+         elif kind == "OPERATOR":
+            yield FastToken(OPERATORS[match.group()], None, source, offset + start, offset + end)
+         elif kind == "NUMBER" or kind == "FRACTION":
+            if match.group("FRACTION") is None:
+               yield FastToken(TT_INT, int(match.group()), source, offset + start, offset + end)
+            else:
+               yield FastToken(TT_FLOAT, float(match.group()), source, offset + start, offset + end)
+         elif kind == "STRING":
+            value = buffer[start + 1:end - 1]
+
+            if "\\" in value:
+               value = ESCAPE_PATTERN.sub(unescape, value)
+
+            yield FastToken(TT_STRING, value, source, offset + start, offset + end)
+         elif kind == "CONCAT":
+            yield FastToken(TT_CONCAT, None, source, offset + start, offset + end)
+         else:
+            if kind == "UNCLOSED":
+               self.error = ExpectedCharacter(source.position(offset + start), source.position(offset + len(buffer)), f"Expected closing {match.group()}")
+            else:
+               self.error = IllegalCharacter(source.position(offset + start), source.position(offset + end), "\"" + match.group() + "\"")
+
+            # Hand the parser an EOF so it stops, whoever's running it checks self.error first
+            break
+
+      end = offset + len(buffer)
+      yield FastToken(TT_EOF, None, source, end, end + 1)
+
+# Nodes don't store positions, they're worked out from their tokens whenever an error asks for them
+
 class StringNode:
+   __slots__ = ("token",)
+
    def __init__(self, token):
       self.token = token
-      self.start = self.token.start
-      self.end = self.token.end
+
+   @property
+   def start(self):
+      return self.token.start
+
+   @property
+   def end(self):
+      return self.token.end
 
    def __repr__(self):
       return f'"{self.token.value}"'
 
 class ListNode:
+   __slots__ = ("element_nodes",)
+
    def __init__(self, element_nodes):
       self.element_nodes = element_nodes
-      self.start = self.element_nodes[0].start if self.element_nodes else None
-      self.end = self.element_nodes[-1].end if self.element_nodes else None
+
+   @property
+   def start(self):
+      return node_start(self)
+
+   @property
+   def end(self):
+      return node_end(self)
 
 class PrintNode:
+   __slots__ = ("args",)
+
    def __init__(self, args):
       self.args = args
-      self.start = self.args[0].start if self.args else None
-      self.end = self.args[-1].end if self.args else None
+
+   @property
+   def start(self):
+      return node_start(self)
+
+   @property
+   def end(self):
+      return node_end(self)
 
 class NumberNode:
+   __slots__ = ("token",)
+
    def __init__(self, token):
       self.token = token
 
-      self.start = self.token.start
-      self.end = self.token.end
+   @property
+   def start(self):
+      return self.token.start
+
+   @property
+   def end(self):
+      return self.token.end
 
    def __repr__(self):
       return f"{self.token.value}"
 
 class VarAccessNode:
+   __slots__ = ("var_name_token",)
+
    def __init__(self, var_name_token):
       self.var_name_token = var_name_token
 
-      self.start = self.var_name_token.start
-      self.end = self.var_name_token.end
+   @property
+   def start(self):
+      return self.var_name_token.start
+
+   @property
+   def end(self):
+      return self.var_name_token.end
 
 class VarAssignNode:
+   __slots__ = ("var_name_token", "value_node")
+
    def __init__(self, var_name_token, value_node):
       self.var_name_token = var_name_token
       self.value_node = value_node
 
-      self.start = self.var_name_token.start
-      self.end = self.value_node.end
+   @property
+   def start(self):
+      return self.var_name_token.start
+
+   @property
+   def end(self):
+      return node_end(self.value_node)
 
 class BinOpNode:
+   __slots__ = ("left_node", "op_token", "right_node")
+
    def __init__(self, left_node, op_token, right_node):
       self.left_node = left_node
       self.op_token = op_token
       self.right_node = right_node
 
-      self.start = self.left_node.start
-      self.end = self.right_node.end
+   @property
+   def start(self):
+      return node_start(self)
+
+   @property
+   def end(self):
+      return node_end(self.right_node)
 
    def __repr__(self):
       return f"({self.left_node}, {self.op_token}, {self.right_node})"
    
 class UnaryOpNode:
+   __slots__ = ("op_token", "node")
+
    def __init__(self, op_token, node):
       self.op_token = op_token
       self.node = node
 
-      self.start = self.op_token.start
-      self.end = node.end
+   @property
+   def start(self):
+      return self.op_token.start
+
+   @property
+   def end(self):
+      return node_end(self.node)
 
    def __repr__(self):
       return f"({self.op_token}, {self.node})"
 
    def __str__(self):
       return self.__repr__()
+
+def node_start(node):
+   # Walks down the left edge in a loop, long chains would run out of recursion otherwise
+   while True:
+      kind = type(node)
+
+      if kind is BinOpNode:
+         node = node.left_node
+      elif kind is PrintNode or kind is ListNode:
+         children = child_nodes(node)
+
+         if not children:
+            return None
+
+         node = children[0]
+      else:
+         return node.start
+
+def node_end(node):
+   # Same on the right edge
+   while True:
+      kind = type(node)
+
+      if kind is BinOpNode:
+         node = node.right_node
+      elif kind is UnaryOpNode:
+         node = node.node
+      elif kind is VarAssignNode:
+         node = node.value_node
+      elif kind is PrintNode or kind is ListNode:
+         children = child_nodes(node)
+
+         if not children:
+            return None
+
+         node = children[-1]
+      else:
+         return node.end
+
+def child_nodes(node):
+   kind = type(node)
+
+   if kind is BinOpNode:
+      return [node.left_node, node.right_node]
+   if kind is UnaryOpNode:
+      return [node.node]
+   if kind is VarAssignNode:
+      return [node.value_node]
+   if kind is PrintNode:
+      return node.args
+   if kind is ListNode:
+      return node.element_nodes
+
+   return []
    
 ## Parser
 
@@ -456,6 +846,40 @@ class ParseResult:
          self.error = error_code
       return self
 
+# Expressions are read with explicit stacks instead of one Python call per grammar rule, so how deep
+# parentheses, ^ chains, print(...) and save ... as go is only limited by memory
+# Every open expression (the whole one, one inside parentheses, a print argument or a saved value) gets a frame
+# with its pending operators and operands, an operator gets applied once one that binds looser shows up
+
+LOGIC_PRECEDENCE = 1
+NOT_PRECEDENCE = 2
+SIGN_PRECEDENCE = 6
+POW_PRECEDENCE = 7
+
+BINARY_PRECEDENCE = {
+   TT_EE: 3, TT_NE: 3, TT_BELOW: 3, TT_ABOVE: 3, TT_AT_MOST: 3, TT_AT_LEAST: 3,
+   TT_PLUS: 4, TT_MINUS: 4,
+   TT_MUL: 5, TT_DIV: 5, TT_CONCAT: 5,
+   TT_POW: POW_PRECEDENCE
+}
+
+FRAME_TOP = 0
+FRAME_PAREN = 1
+FRAME_PRINT = 2
+FRAME_ARGUMENT = 3
+FRAME_SAVE = 4
+
+class ExpressionFrame:
+   __slots__ = ("kind", "operators", "operands", "fresh", "comparison", "extra")
+
+   def __init__(self, kind, extra=None):
+      self.kind = kind
+      self.operators = []
+      self.operands = []
+      self.fresh = True # Nothing read in this frame yet
+      self.comparison = True # Nothing read since the last and/or (or the start)
+      self.extra = extra # Arguments of a print, the name of a save
+
 class Parser:
    def __init__(self, tokens):
       self.tokens = tokens
@@ -530,238 +954,318 @@ class Parser:
       
       return result.success(expr)
    
-   def atom(self):
-      result = ParseResult()
-      token = self.current_token
-
-      if token.type in (TT_INT, TT_FLOAT):
-         result.register_advancement()
-         self.advance()
-         return result.success(NumberNode(token))
-      elif token.type == TT_IDENTIFIER:
-         result.register_advancement()
-         self.advance()
-         return result.success(VarAccessNode(token))
-      elif token.type == TT_STRING:
-         result.register_advancement()
-         self.advance()
-         return result.success(StringNode(token))
-      elif token.type == TT_LPAREN:
-         result.register_advancement()
-         self.advance()
-         expression = result.register(self.expression())
-
-         if result.error:
-            return result
-         
-         if self.current_token.type == TT_RPAREN:
-            result.register_advancement()
-            self.advance()
-            return result.success(expression)
-         else:
-            return result.failure(InvalidSyntax(self.current_token.start, self.current_token.end, f"Expected \")\", got {self.current_token}"))
-         
-      return result.failure(InvalidSyntax(token.start, token.end, "Expected Integer, Float, \"+\", \"-\" or \"(\""))
+   def apply_operators(self, frame, precedence, right=False):
+      # Applies the pending operators that bind at least as tight as the one coming in
+      operators, operands = frame.operators, frame.operands
 
-   def power(self):
-      return self.binary_operation(self.atom, (TT_POW, ), self.factor)
+      while operators:
+         top_precedence, op_token, unary = operators[-1]
 
-   def factor(self):
-      # Factoring and managing all sorts of operations
-      result = ParseResult()
-      token = self.current_token
+         if top_precedence < precedence or (right and top_precedence == precedence):
+            break
 
-      if token.type in (TT_PLUS, TT_MINUS):
-         result.register_advancement()
-         self.advance()
-         factor = result.register(self.factor())
+         operators.pop()
 
-         if result.error:
-            return result
-         
-         return result.success(UnaryOpNode(token, factor))
+         if unary:
+            operands[-1] = UnaryOpNode(op_token, operands[-1])
+         else:
+            right_node = operands.pop()
+            operands[-1] = BinOpNode(operands[-1], op_token, right_node)
 
-      return self.power()
-   
-   def term(self):
-      return self.binary_operation(self.factor, (TT_MUL, TT_DIV, TT_CONCAT))
-   
    def expression(self):
       result = ParseResult()
+      frames = [ExpressionFrame(FRAME_TOP)]
+      expecting_operand = True
+      advances = 0
+
+      while True:
+         frame = frames[-1]
+         token = self.current_token
+         node = None
+
+         if expecting_operand:
+            if frame.fresh and token.matches(TT_KEYWORD, "print"):
+               frame.fresh = False
+               advances += 1
+               self.advance()
 
-      if self.current_token.matches(TT_KEYWORD, "print"):
-         print_expression = result.register(self.print_expression())
-         
-         if result.error:
-            return result
-         
-         return result.success(print_expression)
+               if self.current_token.type != TT_LPAREN:
+                  result.advance_count = advances
+                  return result.failure(InvalidSyntax(self.current_token.start, self.current_token.end, "Expected \"(\" after \"print\""))
 
-      if self.current_token.matches(TT_KEYWORD, "save"):
-         result.register_advancement()
-         self.advance()
+               advances += 1
+               self.advance()
 
-         if self.current_token.type != TT_IDENTIFIER:
-            return result.failure(InvalidSyntax(
-               self.current_token.start, self.current_token.end,
-               "Expected identifier"
-            ))
+               if self.current_token.type == TT_RPAREN:
+                  advances += 1
+                  self.advance()
+                  node = PrintNode([])
+               else:
+                  frames.append(ExpressionFrame(FRAME_PRINT, []))
+                  frames.append(ExpressionFrame(FRAME_ARGUMENT))
+                  continue
+
+            elif frame.fresh and token.matches(TT_KEYWORD, "save"):
+               frame.fresh = False
+               advances += 1
+               self.advance()
 
-         var_name = self.current_token
-         result.register_advancement()
-         self.advance()
+               if self.current_token.type != TT_IDENTIFIER:
+                  result.advance_count = advances
+                  return result.failure(InvalidSyntax(self.current_token.start, self.current_token.end, "Expected identifier"))
 
-         if self.current_token.type != TT_KEYWORD or self.current_token.value != "as":
-            return result.failure(InvalidSyntax(
-               self.current_token.start, self.current_token.end,
-               "Expected \"as\""
-            ))
+               var_name = self.current_token
+               advances += 1
+               self.advance()
 
-         result.register_advancement()
-         self.advance()
+               if self.current_token.type != TT_KEYWORD or self.current_token.value != "as":
+                  result.advance_count = advances
+                  return result.failure(InvalidSyntax(self.current_token.start, self.current_token.end, "Expected \"as\""))
 
-         expr = result.register(self.expression())
+               advances += 1
+               self.advance()
+               frames.append(ExpressionFrame(FRAME_SAVE, var_name))
+               continue
 
-         if result.error:
-            return result
-         
-         return result.success(VarAssignNode(var_name, expr))
+            elif frame.comparison and token.matches(TT_KEYWORD, "not"):
+               frame.operators.append((NOT_PRECEDENCE, token, True))
+               frame.fresh = False
+               advances += 1
+               self.advance()
+               continue
 
-      node = result.register(self.binary_operation(self.comp_expression, ((TT_KEYWORD, "and"), (TT_KEYWORD, "or"))))
+            elif token.type in (TT_PLUS, TT_MINUS):
+               frame.operators.append((SIGN_PRECEDENCE, token, True))
+               frame.fresh = frame.comparison = False
+               advances += 1
+               self.advance()
+               continue
 
-      if result.error:
-         return result.failure(InvalidSyntax(self.current_token.start, self.current_token.end, "Expected \"save\", int, float, identifier, \"+\", \"-\", \"(\", \"not\", or a comparison operator"))
+            elif token.type == TT_LPAREN:
+               frame.fresh = frame.comparison = False
+               advances += 1
+               self.advance()
+               frames.append(ExpressionFrame(FRAME_PAREN))
+               continue
+
+            elif token.type in (TT_INT, TT_FLOAT):
+               frame.operands.append(NumberNode(token))
+            elif token.type == TT_IDENTIFIER:
+               frame.operands.append(VarAccessNode(token))
+            elif token.type == TT_STRING:
+               frame.operands.append(StringNode(token))
+            else:
+               # Same message the old recursive rules ended up with, it depends on which of them hadn't read anything yet
+               if frame.fresh:
+                  message = "Expected \"save\", int, float, identifier, \"+\", \"-\", \"(\", \"not\", or a comparison operator"
+               elif frame.comparison:
+                  message = "Expected int, float, identifier, \"+\", \"-\", \"(\", \"not\", or a comparison operator"
+               else:
+                  message = "Expected Integer, Float, \"+\", \"-\" or \"(\""
+
+               result.advance_count = advances
+               return result.failure(InvalidSyntax(token.start, token.end, message))
+
+            if node is None:
+               frame.fresh = frame.comparison = False
+               expecting_operand = False
+               advances += 1
+               self.advance()
+               continue
+         else:
+            precedence = BINARY_PRECEDENCE.get(token.type)
 
-      return result.success(node)
+            if precedence is None and (token.matches(TT_KEYWORD, "and") or token.matches(TT_KEYWORD, "or")):
+               precedence = LOGIC_PRECEDENCE
 
-   def comp_expression(self):
-      result = ParseResult()
+            if precedence is not None:
+               self.apply_operators(frame, precedence, precedence == POW_PRECEDENCE)
+               frame.operators.append((precedence, token, False))
+               frame.comparison = precedence == LOGIC_PRECEDENCE
+               expecting_operand = True
+               advances += 1
+               self.advance()
+               continue
 
-      if self.current_token.matches(TT_KEYWORD, "not"):
-         op_token = self.current_token
-         result.register_advancement()
-         self.advance()
+            # Nothing else carries this expression on, so it's done
+            self.apply_operators(frame, 0)
+            node = frame.operands[0]
 
-         node = result.register(self.comp_expression())
+         # Close every frame the finished node completes, a print or save ends the expression it started
+         while True:
+            frames.pop()
 
-         if result.error:
-            return result
-         
-         return result.success(UnaryOpNode(op_token, node))
-      
-      node = result.register(self.binary_operation(self.arith_expression, (TT_EE, TT_NE, TT_BELOW, TT_ABOVE, TT_AT_MOST, TT_AT_LEAST)))
-      
-      if result.error:
-         return result.failure(InvalidSyntax(self.current_token.start, self.current_token.end,"Expected int, float, identifier, \"+\", \"-\", \"(\", \"not\", or a comparison operator"))
+            if frame.kind == FRAME_TOP:
+               result.advance_count = advances
+               return result.success(node)
 
-      return result.success(node)
+            if frame.kind == FRAME_SAVE:
+               node = VarAssignNode(frame.extra, node)
+               frame = frames[-1]
+               continue
 
-   def arith_expression(self):
-      return self.binary_operation(self.term, (TT_PLUS, TT_MINUS))
-   
-   def binary_operation(self, function, ops, alternative=None):
-      if alternative == None:
-         alternative = function
+            if frame.kind == FRAME_PAREN:
+               if self.current_token.type != TT_RPAREN:
+                  result.advance_count = advances
+                  return result.failure(InvalidSyntax(self.current_token.start, self.current_token.end, f"Expected \")\", got {self.current_token}"))
 
-      result = ParseResult()
-      left = result.register(function())
+               advances += 1
+               self.advance()
+               frames[-1].operands.append(node)
+               expecting_operand = False
+               break
 
-      if result.error:
-         return result
-      
-      while self.current_token.type in ops or (self.current_token.type, self.current_token.value) in ops:
-         op_token = self.current_token
-         result.register_advancement()
-         self.advance()
-         right = result.register(alternative())
+            # The frame was a print argument
+            arguments = frames[-1].extra
+            arguments.append(node)
 
-         if result.error:
-            return result
-         
-         left = BinOpNode(left, op_token, right)
+            if self.current_token.type == TT_COMMA:
+               advances += 1
+               self.advance()
+               frames.append(ExpressionFrame(FRAME_ARGUMENT))
+               expecting_operand = True
+               break
 
-      return result.success(left)
-   
-   def print_expression(self, expression=None):
-      result = ParseResult()
+            if self.current_token.type != TT_RPAREN:
+               result.advance_count = advances
+               return result.failure(InvalidSyntax(self.current_token.start, self.current_token.end, "Expected \")\" after expression in \"print\""))
+
+            advances += 1
+            self.advance()
+            node = PrintNode(arguments)
+            frames.pop()
+            frame = frames[-1]
 
+   def print_expression(self):
       if not self.current_token.matches(TT_KEYWORD, "print"):
-         return result.failure(InvalidSyntax(self.current_token.start, self.current_token.end, "Expected \"print\""))
-      
-      result.register_advancement()
-      self.advance()
+         return ParseResult().failure(InvalidSyntax(self.current_token.start, self.current_token.end, "Expected \"print\""))
 
-      if self.current_token.type != TT_LPAREN:
-         return result.failure(InvalidSyntax(self.current_token.start, self.current_token.end, "Expected \"(\" after \"print\""))
-      
-      result.register_advancement()
+      return self.expression()
+
+# Pulls tokens from an iterator instead of a list and hands back one statement at a time
+
+class StreamParser(Parser):
+   def __init__(self, tokens):
+      self.token_stream = iter(tokens)
+      self.current_token = None
       self.advance()
 
-      args = []
-      if self.current_token.type != TT_RPAREN:
-         args.append(result.register(self.expression()))
+   def advance(self):
+      token = next(self.token_stream, None)
 
-         if result.error:
-            return result
-         
-         while self.current_token.type == TT_COMMA:
-            result.register_advancement()
-            self.advance()
+      if token is not None:
+         self.current_token = token
 
-            args.append(result.register(self.expression()))
+      return self.current_token
 
-            if result.error:
-               return result
-      
-      if self.current_token.type != TT_RPAREN:
-         return result.failure(InvalidSyntax(self.current_token.start, self.current_token.end, "Expected \")\" after expression in \"print\""))
-      
-      result.register_advancement()
-      self.advance()
+   def statements(self):
+      while self.current_token.type != TT_EOF:
+         result = self.statement()
+         yield result.node, result.error
 
-      return result.success(PrintNode(args))
+         if result.error:
+            return
 
 ## Create a class explicity to handle strings
 
+# Values only remember the node that made them, positions are built from it if an error needs them
+# Whoever runs the operation fills in the error's context, so values don't carry one either
+
+# Long concatenations become a rope, a shared append-only list of parts that only gets joined once
+# something reads .value (printing, multiplying, ...). A rope that owns the end of its list appends in place,
+# so chains like "a" + b + c and save s as s + ... stay linear instead of copying the whole text every time
+
+ROPE_THRESHOLD = 1024
+
 class String:
-   def __init__(self, value):
-      self.value = value
-      self.set_pos()
-      self.set_context()
+   __slots__ = ("text", "parts", "count", "length", "node")
 
-   def set_pos(self, start=None, end=None):
-      self.start = start
-      self.end = end
-      return self
-   
-   def set_context(self, context=None):
-      self.context = context
+   def __init__(self, value, node=None):
+      self.text = value
+      self.parts = None
+      self.count = 0
+      self.length = len(value)
+      self.node = node
+
+   @classmethod
+   def rope(cls, parts, count, length, node=None):
+      string = cls.__new__(cls)
+      string.text = None
+      string.parts = parts
+      string.count = count
+      string.length = length
+      string.node = node
+      return string
+
+   @property
+   def value(self):
+      if self.text is None:
+         parts = self.parts
+         self.text = "".join(parts if len(parts) == self.count else parts[:self.count])
+         self.parts = None
+
+      return self.text
+
+   def set_node(self, node):
+      self.node = node
       return self
+
+   def copy(self):
+      if self.text is None:
+         return String.rope(self.parts, self.count, self.length, self.node)
+
+      return String(self.text, self.node)
+
+   @property
+   def start(self):
+      return self.node.start if self.node is not None else None
+
+   @property
+   def end(self):
+      return self.node.end if self.node is not None else None
+
+   def joined_with(self, text):
+      length = self.length + len(text)
+
+      if self.text is not None:
+         if length < ROPE_THRESHOLD:
+            return String(self.text + text)
+
+         return String.rope([self.text, text], 2, length)
+
+      parts = self.parts
+
+      # Someone else already appended past our end, so branch off with our own copy
+      if len(parts) != self.count:
+         parts = parts[:self.count]
+
+      parts.append(text)
+      return String.rope(parts, self.count + 1, length)
    
    def added_to(self, other):
       if isinstance(other, String):
-         return String(self.value + other.value).set_context(self.context), None
+         return self.joined_with(other.value), None
       elif isinstance(other, Number):
-         return String(self.value + str(other.value)).set_context(self.context), None
+         return self.joined_with(str(other.value)), None
       else:
-         return None, RuntimeError(other.start, other.end, "Unsupported operand type for string concatenation", self.context)
+         return None, RuntimeError(other.start, other.end, "Unsupported operand type for string concatenation")
    
    def concat_with(self, other):
       if isinstance(other, String):
-         return String(self.value + other.value).set_context(self.context), None
+         return self.joined_with(other.value), None
       elif isinstance(other, Number):
-         return String(self.value + str(other.value)).set_context(self.context), None
+         return self.joined_with(str(other.value)), None
       else:
-         return None, RuntimeError(other.start, other.end, "Unsupported operand type for string concatenation", self.context)
+         return None, RuntimeError(other.start, other.end, "Unsupported operand type for string concatenation")
       
    def mul_by(self, other):
       if isinstance(other, Number):
-         return String(self.value * int(other.value)).set_context(self.context), None
+         return String(self.value * int(other.value)), None
       else:
-         return None, RuntimeError(other.start, other.end, "Unsupported operand type for string multiplication", self.context)
+         return None, RuntimeError(other.start, other.end, "Unsupported operand type for string multiplication")
    
    def is_true(self):
-      return len(self.value) > 0
+      return self.length > 0
 
    def __repr__(self):
       return f'"{self.value}"'
@@ -772,70 +1276,80 @@ class String:
 ## Values
 
 class Number:
-   def __init__(self, value):
+   __slots__ = ("value", "node")
+
+   def __init__(self, value, node=None):
       self.value = value
-      self.set_pos()
-      self.set_context()
-   
-   def set_pos(self, start=None, end=None):
-      self.start = start
-      self.end = end
+      self.node = node
 
+   def set_node(self, node):
+      self.node = node
       return self
-   
-   def set_context(self, context=None):
-      self.context = context
-      return self
+
+   def copy(self):
+      return Number(self.value, self.node)
+
+   @property
+   def start(self):
+      return self.node.start if self.node is not None else None
+
+   @property
+   def end(self):
+      return self.node.end if self.node is not None else None
    
    def added_to(self, other):
       if isinstance(other, Number):
-         return Number(self.value + other.value).set_context(self.context), None
+         return Number(self.value + other.value), None
    
    def subbed_by(self, other):
       if isinstance(other, Number):
-         return Number(self.value - other.value).set_context(self.context), None
+         return Number(self.value - other.value), None
    
    def mul_by(self, other):
       if isinstance(other, Number):
-         return Number(self.value * other.value).set_context(self.context), None
+         return Number(self.value * other.value), None
    
    def div_by(self, other):
       if isinstance(other, Number):
          if other.value == 0:
-            return None, RuntimeError(other.start, other.end, "Illegal division, cannot divide by 0", self.context)
-         return Number(self.value / other.value).set_context(self.context), None
+            return None, RuntimeError(other.start, other.end, "Illegal division, cannot divide by 0")
+         return Number(self.value / other.value), None
       
    def pow_by(self, other):
       if isinstance(other, Number):
-         return Number(self.value ** other.value).set_context(self.context), None
+         return Number(self.value ** other.value), None
    
    def get_comparison_eq(self, other):
       if isinstance(other, Number):
-         return Number(int(self.value == other.value)).set_context(self.context), None
+         return Number(int(self.value == other.value)), None
 
    def get_comparison_ne(self, other):
       if isinstance(other, Number):
-         return Number(int(self.value != other.value)).set_context(self.context), None
+         return Number(int(self.value != other.value)), None
 
    def get_comparison_lt(self, other):
       if isinstance(other, Number):
-         return Number(int(self.value < other.value)).set_context(self.context), None
+         return Number(int(self.value < other.value)), None
 
    def get_comparison_gt(self, other):
       if isinstance(other, Number):
-         return Number(int(self.value > other.value)).set_context(self.context), None
+         return Number(int(self.value > other.value)), None
 
    def get_comparison_lte(self, other):
       if isinstance(other, Number):
-         return Number(int(self.value <= other.value)).set_context(self.context), None
+         return Number(int(self.value <= other.value)), None
 
    def get_comparison_gte(self, other):
       if isinstance(other, Number):
-         return Number(int(self.value >= other.value)).set_context(self.context), None
+         return Number(int(self.value >= other.value)), None
 
    def __repr__(self):
       return str(self.value)
 
+# Small whole numbers that don't belong to a node get shared instead of allocated every time
+
+SMALL_NUMBERS = {value: Number(value) for value in range(-5, 257)}
+
 ## Context
 
 class Context:
@@ -877,7 +1391,7 @@ class Interpreter:
       raise Exception(f"No visit_{type(node).__name__} method defined")
 
    def visit_NumberNode(self, node, context):
-      return RuntimeResult().success(Number(node.token.value).set_context(context).set_pos(node.start, node.end))
+      return RuntimeResult().success(Number(node.token.value, node))
 
    def visit_ListNode(self, node, context):
       result = RuntimeResult()
@@ -891,7 +1405,7 @@ class Interpreter:
       return result.success(None)
 
    def visit_StringNode(self, node, context):
-      return RuntimeResult().success(String(node.token.value).set_context(context).set_pos(node.start, node.end))
+      return RuntimeResult().success(String(node.token.value, node))
 
    def visit_PrintNode(self, node, context):
       result = RuntimeResult()
@@ -908,7 +1422,7 @@ class Interpreter:
       print_str = " ".join(str(value.value) for value in values)
       print(print_str)
 
-      return result.success(Number(0))
+      return result.success(SMALL_NUMBERS[0])
 
    def visit_VarAccessNode(self, node, context):
       result = RuntimeResult()
@@ -975,9 +1489,10 @@ class Interpreter:
          return res.failure(RuntimeError(node.start, node.end, "Unsupported operand types for this operation", context))
       
       if error_code:
+         error_code.context = context
          return res.failure(error_code)
       else:
-         return res.success(result.set_pos(node.start, node.end))
+         return res.success(result.set_node(node))
 
    def visit_UnaryOpNode(self, node, context):
       result = RuntimeResult()
@@ -986,35 +1501,1285 @@ class Interpreter:
       if result.error:
          return result
 
+      error_code = None
+
       if node.op_token.type == TT_MINUS:
-         number, error_code = number.mul_by(Number(-1))
+         number, error_code = number.mul_by(SMALL_NUMBERS[-1])
+      else:
+         number = number.copy()
 
       if error_code:
+         error_code.context = context
          return result.failure(error_code)
       else:
-         return result.success(number.set_pos(node.start, node.end))
+         return result.success(number.set_node(node))
 
-## Run functions
+## Optimizer
 
-global_symbol_table = SymbolTable()
-global_symbol_table.set("null", Number(0))
+# Folds arithmetic made only of literals into a single literal before the program runs
+# Anything that errors (or would be too big to precompute) is left alone so it still fails at run time
 
-def run(name, text):
-   lexer = Lexer(name, text)
-   tokens, error = lexer.make_tokens()
-   
-   if error:
-      return None, error
-   
-   parser = Parser(tokens)
-   ast = parser.parse()
-   
-   if ast.error:
-      return None, ast.error
-   
-   interpreter = Interpreter()
-   context = Context("<Program>")
-   context.symbol_table = global_symbol_table
-   result = interpreter.visit(ast.node, context)
-   
-   return result.value, result.error
\ No newline at end of file
+FOLD_EXPONENT_LIMIT = 1024
+FOLD_STRING_LIMIT = 4096
+
+class Optimizer:
+   def __init__(self):
+      self.removed = 0
+      self.methods = {}
+
+   def visit(self, node):
+      # Post-order with an explicit stack, a node comes off it once on the way down and once more
+      # (as a tuple with its child count) after its children, which optimize_X gets already optimized
+      pending = [node]
+      done = []
+
+      while pending:
+         item = pending.pop()
+
+         if type(item) is not tuple:
+            children = child_nodes(item)
+
+            if not children:
+               done.append(item) # Leaves have nothing to optimize
+               continue
+
+            pending.append((item, len(children)))
+            pending.extend(reversed(children))
+            continue
+
+         node, count = item
+         children = done[len(done) - count:]
+         del done[len(done) - count:]
+
+         # Looked up once per node type, same as the resolver
+         method = self.methods.get(type(node))
+
+         if method is None:
+            method_name = f"optimize_{type(node).__name__}"
+            method = self.methods[type(node)] = getattr(self, method_name, self.keep)
+
+         done.append(method(node, children))
+
+      return done[0]
+
+   def keep(self, node, children):
+      return node
+
+   def optimize_ListNode(self, node, children):
+      node.element_nodes = children
+      return node
+
+   def optimize_PrintNode(self, node, children):
+      node.args = children
+      return node
+
+   def optimize_VarAssignNode(self, node, children):
+      node.value_node = children[0]
+      return node
+
+   def optimize_BinOpNode(self, node, children):
+      node.left_node, node.right_node = children
+
+      if is_literal(node.left_node) and is_literal(node.right_node):
+         return self.fold(node, 2)
+
+      return node
+
+   def optimize_UnaryOpNode(self, node, children):
+      node.node = children[0]
+      return self.fold(node, 1) if is_literal(node.node) else node
+
+   def fold(self, node, removed):
+      if self.too_costly(node) or self.unsupported(node):
+         return node
+
+      try:
+         result, error_code = self.evaluate(node)
+      except (ArithmeticError, ValueError, MemoryError):
+         return node # Let the same exception happen at run time instead
+
+      if error_code or result is None:
+         return node
+
+      value = result.value
+
+      if isinstance(result, String) and type(value) is str:
+         token_type = TT_STRING
+      elif isinstance(result, Number) and type(value) in (int, float):
+         token_type = TT_INT if type(value) is int else TT_FLOAT
+      else:
+         return node
+
+      # The new token spans the whole expression, that's what the interpreter would've reported
+      if type(node) is BinOpNode:
+         first, last = node.left_node.token, node.right_node.token
+      else:
+         first, last = node.op_token, node.node.token
+
+      self.removed += removed
+      token = spanning_token(token_type, value, first, last)
+      return StringNode(token) if token_type == TT_STRING else NumberNode(token)
+
+   def evaluate(self, node):
+      # Same value methods the interpreter would pick, just without visiting anything
+      if type(node) is UnaryOpNode:
+         value = literal_value(node.node)
+
+         if node.op_token.type == TT_MINUS:
+            return value.mul_by(SMALL_NUMBERS[-1])
+
+         return value.copy(), None
+
+      left, right = literal_value(node.left_node), literal_value(node.right_node)
+      op_type = node.op_token.type
+
+      if op_type == TT_PLUS:
+         return left.added_to(right)
+
+      if op_type == TT_MUL and isinstance(left, String):
+         return left.mul_by(right)
+
+      if op_type == TT_MUL and isinstance(right, String):
+         return right.mul_by(left)
+
+      method = NUMBER_OPERATIONS.get(op_type)
+
+      if method is None or not (isinstance(left, Number) and isinstance(right, Number)):
+         return None, None
+
+      return method(left, right)
+
+   def unsupported(self, node):
+      # Number.added_to has no string case and blows up instead of returning an error, leave that to run time
+      if not isinstance(node, BinOpNode) or node.op_token.type != TT_PLUS:
+         return False
+
+      return isinstance(node.left_node.token.value, (int, float)) and isinstance(node.right_node.token.value, str)
+
+   def too_costly(self, node):
+      if not isinstance(node, BinOpNode):
+         return False
+
+      left, right = node.left_node.token.value, node.right_node.token.value
+
+      if node.op_token.type == TT_POW:
+         return isinstance(right, (int, float)) and abs(right) > FOLD_EXPONENT_LIMIT
+
+      if node.op_token.type == TT_MUL:
+         if isinstance(left, str) and isinstance(right, (int, float)):
+            return len(left) * int(right) > FOLD_STRING_LIMIT
+         if isinstance(right, str) and isinstance(left, (int, float)):
+            return len(right) * int(left) > FOLD_STRING_LIMIT
+
+      # Folding a long chain of string literals pairwise would copy the text over and over, the rope does it better
+      if node.op_token.type == TT_PLUS and isinstance(left, str):
+         return len(left) + len(str(right)) > FOLD_STRING_LIMIT
+
+      return False
+
+def is_literal(node):
+   return isinstance(node, (NumberNode, StringNode))
+
+def literal_value(node):
+   return String(node.token.value, node) if type(node) is StringNode else Number(node.token.value, node)
+
+def spanning_token(type_, value, first, last):
+   # Tokens from the same source keep plain offsets, only mixed ones pay for full positions
+   if isinstance(first, FastToken) and isinstance(last, FastToken) and first.source is last.source:
+      return FastToken(type_, value, first.source, token_span(first)[0], token_span(last)[1])
+
+   return Token(type_, value, first.start, last.end)
+
+## Compiler
+
+# Turns the tree into nested closures once, so running it skips the visit lookups and RuntimeResults
+
+class CompiledFailure(Exception):
+   def __init__(self, error):
+      super().__init__(error.details)
+      self.error = error
+
+NUMBER_OPERATIONS = {
+   TT_MINUS: Number.subbed_by,
+   TT_MUL: Number.mul_by,
+   TT_DIV: Number.div_by,
+   TT_POW: Number.pow_by,
+   TT_EE: Number.get_comparison_eq,
+   TT_NE: Number.get_comparison_ne,
+   TT_BELOW: Number.get_comparison_lt,
+   TT_ABOVE: Number.get_comparison_gt,
+   TT_AT_MOST: Number.get_comparison_lte,
+   TT_AT_LEAST: Number.get_comparison_gte
+}
+
+class Compiler:
+   # The closures get what they need as default arguments instead of capturing it, every captured
+   # variable is a cell the garbage collector has to walk, and a program has one closure per node
+
+   def __init__(self):
+      self.methods = {}
+
+   def compile(self, node):
+      with paused_gc():
+         function = self.visit(node)
+
+      def program(context):
+         try:
+            return function(context), None
+         except CompiledFailure as failure:
+            return None, failure.error
+
+      return program
+
+   def visit(self, node):
+      # Looked up once per node type, same as the resolver
+      method = self.methods.get(type(node))
+
+      if method is None:
+         method_name = f"compile_{type(node).__name__}"
+         method = self.methods[type(node)] = getattr(self, method_name, self.no_compile_method)
+
+      return method(node)
+
+   def no_compile_method(self, node):
+      raise Exception(f"No compile_{type(node).__name__} method defined")
+
+   def compile_NumberNode(self, node):
+      def number(context, value=node.token.value, node=node):
+         return Number(value, node)
+
+      return number
+
+   def compile_StringNode(self, node):
+      def string(context, value=node.token.value, node=node):
+         return String(value, node)
+
+      return string
+
+   def compile_ListNode(self, node):
+      elements = []
+
+      for element in node.element_nodes:
+         elements.append(self.visit(element))
+
+      def statements(context, elements=tuple(elements)):
+         for element in elements:
+            element(context)
+
+      return statements
+
+   def compile_PrintNode(self, node):
+      # Plain loops, a comprehension is one more Python frame per nested print
+      args = []
+
+      for arg in node.args:
+         args.append(self.visit(arg))
+
+      def print_values(context, args=tuple(args)):
+         values = []
+
+         for arg in args:
+            values.append(str(arg(context).value))
+
+         print(" ".join(values))
+         return SMALL_NUMBERS[0]
+
+      return print_values
+
+   def compile_VarAccessNode(self, node):
+      def access(context, var_name=node.var_name_token.value, node=node):
+         value = context.symbol_table.get(var_name)
+
+         if not value:
+            raise CompiledFailure(RuntimeError(node.start, node.end, f"\"{var_name}\" undefined", context))
+
+         return value
+
+      return access
+
+   def compile_VarAssignNode(self, node):
+      def assign(context, var_name=node.var_name_token.value, value_function=self.visit(node.value_node)):
+         value = value_function(context)
+         context.symbol_table.set(var_name, value)
+         return value
+
+      return assign
+
+   def compile_BinOpNode(self, node):
+      left_function = self.visit(node.left_node)
+      right_function = self.visit(node.right_node)
+      op_type = node.op_token.type
+
+      if op_type == TT_PLUS:
+         def add(context, left_function=left_function, right_function=right_function, node=node):
+            result, error_code = left_function(context).added_to(right_function(context))
+
+            if error_code:
+               error_code.context = context
+               raise CompiledFailure(error_code)
+
+            return result.set_node(node)
+
+         return add
+
+      if op_type == TT_MUL:
+         def multiply(context, left_function=left_function, right_function=right_function, node=node):
+            left = left_function(context)
+            right = right_function(context)
+
+            if isinstance(left, String):
+               result, error_code = left.mul_by(right)
+            elif isinstance(right, String):
+               result, error_code = right.mul_by(left)
+            elif isinstance(left, Number) and isinstance(right, Number):
+               result, error_code = left.mul_by(right)
+            else:
+               raise CompiledFailure(RuntimeError(node.start, node.end, "Unsupported operand types for this operation", context))
+
+            if error_code:
+               error_code.context = context
+               raise CompiledFailure(error_code)
+
+            return result.set_node(node)
+
+         return multiply
+
+      def binary(context, left_function=left_function, right_function=right_function, node=node, method=NUMBER_OPERATIONS.get(op_type)):
+         left = left_function(context)
+         right = right_function(context)
+
+         if not (isinstance(left, Number) and isinstance(right, Number)):
+            raise CompiledFailure(RuntimeError(node.start, node.end, "Unsupported operand types for this operation", context))
+
+         if method is None:
+            raise CompiledFailure(RuntimeError(node.start, node.end, f"Invalid operator: {node.op_token.type}", context))
+
+         result, error_code = method(left, right)
+
+         if error_code:
+            error_code.context = context
+            raise CompiledFailure(error_code)
+
+         return result.set_node(node)
+
+      return binary
+
+   def compile_UnaryOpNode(self, node):
+      function = self.visit(node.node)
+
+      if node.op_token.type != TT_MINUS:
+         def unary(context, function=function, node=node):
+            return function(context).copy().set_node(node)
+
+         return unary
+
+      def negate(context, function=function, node=node):
+         number, error_code = function(context).mul_by(SMALL_NUMBERS[-1])
+
+         if error_code:
+            error_code.context = context
+            raise CompiledFailure(error_code)
+
+         return number.set_node(node)
+
+      return negate
+
+## Resolver
+
+# Gives every variable a fixed slot before the program runs, so reading one is a list index instead of walking dicts
+# It also flattens the tree into postfix steps for the StackEvaluator, using its own stack so deep trees never recurse
+
+OP_LOAD, OP_NUMBER, OP_ADD, OP_BINARY, OP_STORE, OP_POP, OP_STRING, OP_MUL, OP_PRINT, OP_NEGATE, OP_COPY, OP_NONE = range(12)
+
+class Resolver:
+   def __init__(self):
+      self.slots = {}
+      self.names = [] # Slot -> name, kept across statements when streaming
+
+   def slot(self, name):
+      index = self.slots.get(name)
+
+      if index is None:
+         index = self.slots[name] = len(self.names)
+         self.names.append(name)
+
+      return index
+
+   def resolve(self, node):
+      # Returns (code, stored), stored being every slot the code assigns to
+      code = []
+      stored = set()
+      pending = [node]
+
+      with paused_gc():
+         self.flatten(pending, code, stored)
+
+      return code, stored
+
+   def flatten(self, pending, code, stored):
+      methods = {}
+
+      while pending:
+         item = pending.pop()
+
+         if type(item) is tuple:
+            code.append(item)
+
+            if item[0] == OP_STORE:
+               stored.add(item[2])
+
+            continue
+
+         # Looked up once per node type, there are a lot more nodes than types
+         method = methods.get(type(item))
+
+         if method is None:
+            method_name = f"resolve_{type(item).__name__}"
+            method = methods[type(item)] = getattr(self, method_name, self.no_resolve_method)
+
+         method(item, pending, code)
+
+   def no_resolve_method(self, node, pending, code):
+      raise Exception(f"No resolve_{type(node).__name__} method defined")
+
+   # Leaves go straight into the code, everything else pushes its own step and then its children backwards
+   # so the children come out (and get emitted) first
+
+   def resolve_NumberNode(self, node, pending, code):
+      code.append((OP_NUMBER, node, node.token.value))
+
+   def resolve_StringNode(self, node, pending, code):
+      code.append((OP_STRING, node, node.token.value))
+
+   def resolve_VarAccessNode(self, node, pending, code):
+      name = node.var_name_token.value
+      index = self.slots.get(name)
+      code.append((OP_LOAD, node, self.slot(name) if index is None else index))
+
+   def resolve_VarAssignNode(self, node, pending, code):
+      pending.append((OP_STORE, node, self.slot(node.var_name_token.value)))
+      pending.append(node.value_node)
+
+   def resolve_BinOpNode(self, node, pending, code):
+      op_type = node.op_token.type
+
+      if op_type == TT_PLUS:
+         pending.append((OP_ADD, node, None))
+      elif op_type == TT_MUL:
+         pending.append((OP_MUL, node, None))
+      else:
+         pending.append((OP_BINARY, node, NUMBER_OPERATIONS.get(op_type)))
+
+      pending.append(node.right_node)
+      pending.append(node.left_node)
+
+   def resolve_UnaryOpNode(self, node, pending, code):
+      pending.append((OP_NEGATE if node.op_token.type == TT_MINUS else OP_COPY, node, None))
+      pending.append(node.node)
+
+   def resolve_PrintNode(self, node, pending, code):
+      pending.append((OP_PRINT, node, len(node.args)))
+      pending.extend(reversed(node.args))
+
+   def resolve_ListNode(self, node, pending, code):
+      pending.append((OP_NONE, node, None))
+
+      for element in reversed(node.element_nodes):
+         pending.append((OP_POP, node, None))
+         pending.append(element)
+
+## Stack evaluator
+
+# Runs the resolver's steps with a value stack, so how deep an expression goes doesn't matter
+# Variables live in a plain list indexed by slot, filled from the context's symbol table the first time a name shows up
+# and written back to it afterwards, so anything reading the symbol table later sees the same thing as with the other backends
+
+class StackEvaluator:
+   def __init__(self, resolver, context):
+      self.resolver = resolver
+      self.context = context
+      self.values = []
+
+   def execute(self, code, stored):
+      values = self.values
+      symbol_table = self.context.symbol_table
+
+      for name in self.resolver.names[len(values):]:
+         values.append(symbol_table.get(name))
+
+      try:
+         return self.evaluate(code)
+      finally:
+         names = self.resolver.names
+
+         for slot in stored:
+            if values[slot] is not None:
+               symbol_table.set(names[slot], values[slot])
+
+   def evaluate(self, code, stack=None):
+      values = self.values
+      context = self.context
+
+      if stack is None:
+         stack = []
+
+      push = stack.append
+      pop = stack.pop
+
+      for op, node, argument in code:
+         if op == OP_LOAD:
+            value = values[argument]
+
+            if value is None:
+               return None, RuntimeError(node.start, node.end, f"\"{node.var_name_token.value}\" undefined", context)
+
+            push(value)
+         elif op == OP_NUMBER:
+            push(Number(argument, node))
+         elif op == OP_ADD:
+            right = pop()
+            result, error_code = stack[-1].added_to(right)
+
+            if error_code:
+               error_code.context = context
+               return None, error_code
+
+            stack[-1] = result.set_node(node)
+         elif op == OP_BINARY:
+            right = pop()
+            left = stack[-1]
+
+            if not (isinstance(left, Number) and isinstance(right, Number)):
+               return None, RuntimeError(node.start, node.end, "Unsupported operand types for this operation", context)
+
+            if argument is None:
+               return None, RuntimeError(node.start, node.end, f"Invalid operator: {node.op_token.type}", context)
+
+            result, error_code = argument(left, right)
+
+            if error_code:
+               error_code.context = context
+               return None, error_code
+
+            stack[-1] = result.set_node(node)
+         elif op == OP_STORE:
+            values[argument] = stack[-1]
+         elif op == OP_POP:
+            pop()
+         elif op == OP_STRING:
+            push(String(argument, node))
+         elif op == OP_MUL:
+            right = pop()
+            left = stack[-1]
+
+            if isinstance(left, String):
+               result, error_code = left.mul_by(right)
+            elif isinstance(right, String):
+               result, error_code = right.mul_by(left)
+            elif isinstance(left, Number) and isinstance(right, Number):
+               result, error_code = left.mul_by(right)
+            else:
+               return None, RuntimeError(node.start, node.end, "Unsupported operand types for this operation", context)
+
+            if error_code:
+               error_code.context = context
+               return None, error_code
+
+            stack[-1] = result.set_node(node)
+         elif op == OP_PRINT:
+            first = len(stack) - argument
+            print(" ".join([str(value.value) for value in stack[first:]]))
+            del stack[first:]
+            push(SMALL_NUMBERS[0])
+         elif op == OP_NEGATE:
+            number, error_code = stack[-1].mul_by(SMALL_NUMBERS[-1])
+
+            if error_code:
+               error_code.context = context
+               return None, error_code
+
+            stack[-1] = number.set_node(node)
+         elif op == OP_COPY:
+            stack[-1] = stack[-1].copy().set_node(node)
+         elif op == OP_NONE:
+            push(None)
+
+      return (stack[-1] if stack else None), None
+
+## Profiler
+
+# Everything here is only used when a Profile is passed in, the normal classes never check for one
+
+class Profile:
+   def __init__(self):
+      self.phases = {}
+      self.counts = {}
+      self.visits = {} # Node type -> [count, cumulative, self]
+      self.lookups = {}
+      self.assignments = {}
+      self.output_bytes = 0
+      self.nesting = {}
+      self.child_time = [0.0]
+
+   @contextmanager
+   def phase(self, name):
+      start = perf_counter()
+
+      try:
+         yield
+      finally:
+         self.phases[name] = self.phases.get(name, 0.0) + perf_counter() - start
+
+   def count(self, name, amount=1):
+      self.counts[name] = self.counts.get(name, 0) + amount
+
+   def timed(self, name, function, *args):
+      # Cumulative time only counts the outermost visit of a node type, so recursion isn't counted twice
+      depth = self.nesting.get(name, 0)
+      self.nesting[name] = depth + 1
+      self.child_time.append(0.0)
+      start = perf_counter()
+
+      try:
+         return function(*args)
+      finally:
+         elapsed = perf_counter() - start
+         children = self.child_time.pop()
+         self.child_time[-1] += elapsed
+         self.nesting[name] = depth
+
+         self.visited(name, elapsed - children, elapsed if depth == 0 else 0.0)
+
+   def visited(self, name, own, cumulative=0.0, count=1):
+      visit = self.visits.get(name)
+
+      if visit is None:
+         visit = self.visits[name] = [0, 0.0, 0.0]
+
+      visit[0] += count
+      visit[1] += cumulative
+      visit[2] += own
+
+   def as_dict(self):
+      return {
+         "phases": dict(self.phases),
+         "total": sum(self.phases.values()),
+         "counts": dict(self.counts),
+         "visits": {name: {"count": count, "cumulative": cumulative, "self": own} for name, (count, cumulative, own) in self.visits.items()},
+         "lookups": dict(self.lookups),
+         "assignments": dict(self.assignments),
+         "output_bytes": self.output_bytes
+      }
+
+   def as_json(self):
+      return json.dumps(self.as_dict(), indent=3)
+
+   def as_text(self):
+      lines = ["Phases"]
+
+      for name, seconds in self.phases.items():
+         lines.append(f"   {name:<16}{seconds * 1000:>12.3f} ms")
+
+      lines.append(f"   {'total':<16}{sum(self.phases.values()) * 1000:>12.3f} ms")
+      lines.append("Counts")
+
+      for name, amount in self.counts.items():
+         lines.append(f"   {name:<16}{amount:>12}")
+
+      if self.visits:
+         lines.append(f"{'Node visits':<19}{'count':>12}{'cumulative':>16}{'self':>16}")
+
+         for name, (count, cumulative, own) in sorted(self.visits.items(), key=lambda item: -item[1][2]):
+            lines.append(f"   {name:<16}{count:>12}{cumulative * 1000:>13.3f} ms{own * 1000:>13.3f} ms")
+
+      if self.lookups or self.assignments:
+         lines.append(f"{'Variables':<19}{'lookups':>12}{'assignments':>16}")
+
+         for name in sorted(set(self.lookups) | set(self.assignments), key=lambda name: -self.lookups.get(name, 0)):
+            lines.append(f"   {name:<16}{self.lookups.get(name, 0):>12}{self.assignments.get(name, 0):>16}")
+
+      lines.append(f"Output           {self.output_bytes:>12} bytes")
+      return "\n".join(lines)
+
+def profile_phase(profile, name):
+   return profile.phase(name) if profile is not None else nullcontext()
+
+class ProfilingInterpreter(Interpreter):
+   def __init__(self, profile):
+      self.profile = profile
+
+   def visit(self, node, context):
+      return self.profile.timed(type(node).__name__, super().visit, node, context)
+
+class ProfilingCompiler(Compiler):
+   def __init__(self, profile):
+      super().__init__()
+      self.profile = profile
+
+   def visit(self, node):
+      function = super().visit(node)
+      name = type(node).__name__
+      timed = self.profile.timed
+
+      def profiled(context):
+         return timed(name, function, context)
+
+      return profiled
+
+# How many values each step takes off the stack, everything but OP_POP leaves one behind
+STEP_INPUTS = {OP_ADD: 2, OP_BINARY: 2, OP_MUL: 2, OP_NEGATE: 1, OP_COPY: 1, OP_STORE: 1, OP_POP: 1}
+
+class ProfilingStackEvaluator(StackEvaluator):
+   def __init__(self, resolver, context, profile):
+      super().__init__(resolver, context)
+      self.profile = profile
+
+   def evaluate(self, code, stack=None):
+      # Runs the steps one at a time so each one gets timed, a node's own time is its step
+      # and its cumulative time runs from the first step of its children to its own step
+      profile = self.profile
+      names = self.resolver.names
+      lookups = profile.lookups
+      assignments = profile.assignments
+      step = super().evaluate
+      stack = []
+      starts = [] # When the children behind each value on the stack started running
+      spans = {} # Node type -> [start, end] of every visit, overlapping ones get merged at the end
+      popped = None # Earliest finished statement, the ListNode's span starts there
+
+      try:
+         for instruction in code:
+            op, node, argument = instruction
+
+            if op == OP_LOAD:
+               name = names[argument]
+               lookups[name] = lookups.get(name, 0) + 1
+            elif op == OP_STORE:
+               name = names[argument]
+               assignments[name] = assignments.get(name, 0) + 1
+
+            start = perf_counter()
+            value, error = step((instruction,), stack)
+            end = perf_counter()
+
+            if op == OP_POP:
+               first = starts.pop()
+               popped = first if popped is None else min(popped, first)
+               continue
+
+            inputs = argument if op == OP_PRINT else STEP_INPUTS.get(op, 0)
+
+            if inputs:
+               first = min(starts[-inputs:])
+               del starts[-inputs:]
+            elif op == OP_NONE and popped is not None:
+               first = popped
+            else:
+               first = start
+
+            name = type(node).__name__
+            profile.visited(name, end - start)
+            spans.setdefault(name, []).append((first, end))
+
+            if error:
+               return None, error
+
+            starts.append(first)
+
+         return (stack[-1] if stack else None), None
+      finally:
+         for name, intervals in spans.items():
+            profile.visited(name, 0.0, merged_length(intervals), 0)
+
+def merged_length(intervals):
+   # Visits of the same node type are either nested or apart, so only the outermost ones count
+   total = 0.0
+   reach = None
+
+   for start, end in sorted(intervals):
+      if reach is None or start >= reach:
+         total += end - start
+         reach = end
+      elif end > reach:
+         total += end - reach
+         reach = end
+
+   return total
+
+# Shares the real table's symbols, so whatever the script saves still ends up in the real table
+
+class ProfilingSymbolTable(SymbolTable):
+   def __init__(self, table, profile):
+      self.symbols = table.symbols
+      self.parent = table.parent
+      self.profile = profile
+
+   def get(self, name):
+      lookups = self.profile.lookups
+      lookups[name] = lookups.get(name, 0) + 1
+      return super().get(name)
+
+   def set(self, name, value):
+      assignments = self.profile.assignments
+      assignments[name] = assignments.get(name, 0) + 1
+      super().set(name, value)
+
+class OutputCounter:
+   def __init__(self, stream, profile):
+      self.stream = stream
+      self.profile = profile
+
+   def write(self, text):
+      self.profile.output_bytes += len(text.encode("utf-8", "surrogatepass"))
+      return self.stream.write(text)
+
+   def __getattr__(self, name):
+      return getattr(self.stream, name)
+
+def count_nodes(node):
+   count = 0
+   stack = [node]
+
+   while stack:
+      node = stack.pop()
+      count += 1
+      stack.extend(child_nodes(node))
+
+   return count
+
+def make_interpreter(profile):
+   return Interpreter() if profile is None else ProfilingInterpreter(profile)
+
+def make_compiler(profile):
+   return Compiler() if profile is None else ProfilingCompiler(profile)
+
+def make_evaluator(resolver, context, profile):
+   return StackEvaluator(resolver, context) if profile is None else ProfilingStackEvaluator(resolver, context, profile)
+
+def make_context(profile, symbol_table=None):
+   if symbol_table is None:
+      symbol_table = global_symbol_table
+
+   context = Context("<Program>")
+   context.symbol_table = symbol_table if profile is None else ProfilingSymbolTable(symbol_table, profile)
+   return context
+
+def counted_output(profile):
+   return redirect_stdout(OutputCounter(sys.stdout, profile)) if profile is not None else nullcontext()
+
+## Cache
+
+# Parsed programs get saved next to the script (script.su -> script.suc), like Python's __pycache__
+# The file is a small header (format, source hash, optimizer flag) followed by the tree in post-order
+
+CACHE_MAGIC = b"SUC"
+CACHE_FORMAT = 1
+CACHE_HASH_SIZE = 16
+CACHE_HEADER_SIZE = len(CACHE_MAGIC) + 3 + CACHE_HASH_SIZE
+
+def cache_path(name):
+   return name + "c"
+
+def source_hash(text):
+   return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=CACHE_HASH_SIZE).digest()
+
+def cache_header(text, optimize):
+   return CACHE_MAGIC + bytes((CACHE_FORMAT, marshal.version, int(optimize))) + source_hash(text)
+
+def token_span(token):
+   if isinstance(token, FastToken):
+      return token.start_index, token.end_index
+
+   return token.start.index, token.end.index
+
+class TreeEncoder:
+   def __init__(self):
+      self.records = []
+
+   def visit(self, node):
+      # Same explicit stack as the resolver, a node pushes its own record and then its children backwards
+      # so the records still come out in post-order however deep the tree goes
+      pending = [node]
+      methods = {}
+
+      while pending:
+         item = pending.pop()
+
+         if type(item) is tuple:
+            self.records.append(item)
+            continue
+
+         method = methods.get(type(item))
+
+         if method is None:
+            method_name = f"encode_{type(item).__name__}"
+            method = methods[type(item)] = getattr(self, method_name, self.no_encode_method)
+
+         method(item, pending)
+
+   def no_encode_method(self, node, pending):
+      raise Exception(f"No encode_{type(node).__name__} method defined")
+
+   def encode_NumberNode(self, node, pending):
+      self.records.append(("num", node.token.type, node.token.value) + token_span(node.token))
+
+   def encode_StringNode(self, node, pending):
+      self.records.append(("str", node.token.value) + token_span(node.token))
+
+   def encode_VarAccessNode(self, node, pending):
+      token = node.var_name_token
+      self.records.append(("get", token.value) + token_span(token))
+
+   def encode_VarAssignNode(self, node, pending):
+      token = node.var_name_token
+      pending.append(("set", token.value) + token_span(token))
+      pending.append(node.value_node)
+
+   def encode_BinOpNode(self, node, pending):
+      token = node.op_token
+      pending.append(("bin", token.type, token.value) + token_span(token))
+      pending.append(node.right_node)
+      pending.append(node.left_node)
+
+   def encode_UnaryOpNode(self, node, pending):
+      token = node.op_token
+      pending.append(("unary", token.type, token.value) + token_span(token))
+      pending.append(node.node)
+
+   def encode_PrintNode(self, node, pending):
+      pending.append(("print", len(node.args)))
+      pending.extend(reversed(node.args))
+
+   def encode_ListNode(self, node, pending):
+      pending.append(("list", len(node.element_nodes)))
+      pending.extend(reversed(node.element_nodes))
+
+def decode_tree(records, source):
+   stack = []
+
+   for record in records:
+      kind = record[0]
+
+      if kind == "num":
+         stack.append(NumberNode(FastToken(record[1], record[2], source, record[3], record[4])))
+      elif kind == "str":
+         stack.append(StringNode(FastToken(TT_STRING, record[1], source, record[2], record[3])))
+      elif kind == "get":
+         stack.append(VarAccessNode(FastToken(TT_IDENTIFIER, record[1], source, record[2], record[3])))
+      elif kind == "set":
+         stack.append(VarAssignNode(FastToken(TT_IDENTIFIER, record[1], source, record[2], record[3]), stack.pop()))
+      elif kind == "bin":
+         right = stack.pop()
+         stack.append(BinOpNode(stack.pop(), FastToken(record[1], record[2], source, record[3], record[4]), right))
+      elif kind == "unary":
+         stack.append(UnaryOpNode(FastToken(record[1], record[2], source, record[3], record[4]), stack.pop()))
+      elif kind in ("print", "list"):
+         count = record[1]
+         items = stack[len(stack) - count:] if count else []
+         del stack[len(stack) - count:]
+         stack.append(PrintNode(items) if kind == "print" else ListNode(items))
+      else:
+         raise ValueError(f"Unknown cache record {kind!r}")
+
+   if len(stack) != 1 or not isinstance(stack[0], ListNode):
+      raise ValueError("Cached tree is incomplete")
+
+   return stack[0]
+
+def load_cached(name, text, optimize):
+   # Returns (node, folded_nodes, status), node is None unless status is "hit"
+   try:
+      with open(cache_path(name), "rb") as file:
+         data = file.read()
+   except OSError:
+      return None, 0, "miss"
+
+   if data[:CACHE_HEADER_SIZE] != cache_header(text, optimize):
+      return None, 0, "stale"
+
+   try:
+      with paused_gc():
+         folded_nodes, records = marshal.loads(data[CACHE_HEADER_SIZE:])
+         node = decode_tree(records, Source(name, text))
+   except Exception:
+      return None, 0, "corrupt"
+
+   return node, folded_nodes, "hit"
+
+def store_cached(name, text, optimize, node, folded_nodes):
+   encoder = TreeEncoder()
+   encoder.visit(node)
+
+   path = cache_path(name)
+   temporary = f"{path}.{os.getpid()}.tmp"
+
+   try:
+      with open(temporary, "wb") as file:
+         file.write(cache_header(text, optimize))
+         file.write(marshal.dumps((folded_nodes, encoder.records)))
+
+      os.replace(temporary, path)
+   except OSError:
+      # A cache we can't write (read-only folder, etc.) just means no cache
+      try:
+         os.remove(temporary)
+      except OSError:
+         pass
+
+## Run functions
+
+def new_symbol_table():
+   symbol_table = SymbolTable()
+   symbol_table.set("null", SMALL_NUMBERS[0])
+   return symbol_table
+
+global_symbol_table = new_symbol_table()
+
+BACKENDS = ("interpreter", "compiled", "stack")
+
+def parse_program(name, text, optimize=True, stats=None, profile=None):
+   with paused_gc():
+      with profile_phase(profile, "lex"):
+         lexer = FastLexer(name, text)
+         tokens, error = lexer.make_tokens()
+
+      if error:
+         return None, error
+
+      with profile_phase(profile, "parse"):
+         parser = Parser(tokens)
+         ast = parser.parse()
+   
+   if ast.error:
+      return None, ast.error
+
+   node = ast.node
+
+   if profile is not None:
+      profile.count("tokens", len(tokens))
+      profile.count("nodes", count_nodes(node))
+      profile.count("statements", len(node.element_nodes))
+
+   if optimize:
+      with paused_gc(), profile_phase(profile, "optimize"):
+         optimizer = Optimizer()
+         node = optimizer.visit(node)
+
+      if stats is not None:
+         stats["folded_nodes"] = optimizer.removed
+
+   return node, None
+
+def load_program(name, text, optimize=True, cache=False, stats=None, profile=None):
+   if stats is None:
+      stats = {}
+
+   if not cache:
+      return parse_program(name, text, optimize, stats, profile)
+
+   with profile_phase(profile, "cache load"):
+      node, folded_nodes, status = load_cached(name, text, optimize)
+
+   stats["cache"] = status
+
+   if node is not None:
+      if optimize:
+         stats["folded_nodes"] = folded_nodes
+
+      if profile is not None:
+         profile.count("nodes", count_nodes(node))
+         profile.count("statements", len(node.element_nodes))
+
+      return node, None
+
+   node, error = parse_program(name, text, optimize, stats, profile)
+
+   if not error:
+      with profile_phase(profile, "cache store"):
+         store_cached(name, text, optimize, node, stats.get("folded_nodes", 0))
+
+   return node, error
+
+def run(name, text, backend="interpreter", optimize=None, cache=False, stats=None, profile=None, symbol_table=None):
+   if stats is None:
+      stats = {}
+
+   # Folding only pays off when the folded tree gets cached, for a single run it costs more than it saves
+   if optimize is None:
+      optimize = cache
+
+   node, error = load_program(name, text, optimize, cache, stats, profile)
+
+   if profile is not None:
+      profile.counts.update(stats)
+
+   if error:
+      return None, error
+   
+   # The stack backend counts its own slot loads and stores, its symbol table is only touched to fill and save slots
+   context = make_context(profile if backend != "stack" else None, symbol_table)
+
+   if backend == "stack":
+      with profile_phase(profile, "resolve"):
+         resolver = Resolver()
+         code, stored = resolver.resolve(node)
+
+      with profile_phase(profile, "execute"), counted_output(profile):
+         return make_evaluator(resolver, context, profile).execute(code, stored)
+
+   if backend == "compiled":
+      with profile_phase(profile, "compile"):
+         program = make_compiler(profile).compile(node)
+
+      with profile_phase(profile, "execute"), counted_output(profile):
+         return program(context)
+
+   interpreter = make_interpreter(profile)
+
+   with profile_phase(profile, "execute"), counted_output(profile):
+      result = interpreter.visit(node, context)
+   
+   return result.value, result.error
+
+def run_stream(name, file, backend="interpreter", optimize=False, chunk_size=STREAM_CHUNK_SIZE, stats=None, profile=None):
+   # Every statement runs as soon as it's parsed, so anything before an error has already happened
+   if stats is None:
+      stats = {}
+
+   if optimize:
+      stats["folded_nodes"] = 0
+
+   lexer = StreamLexer(name, file, chunk_size)
+   tokens = lexer.tokens()
+
+   if profile is not None:
+      tokens = counted_tokens(tokens, profile)
+
+   parser = StreamParser(tokens)
+   statements = parser.statements()
+
+   context = make_context(profile if backend != "stack" else None)
+
+   optimizer = Optimizer()
+   compiler = make_compiler(profile)
+   interpreter = make_interpreter(profile)
+
+   # The stack backend keeps its slots between statements, a name resolved once keeps the same slot
+   resolver = Resolver()
+   evaluator = make_evaluator(resolver, context, profile)
+
+   while True:
+      # Lexing happens inside the parser here, so the two share a phase
+      with profile_phase(profile, "lex + parse"):
+         node, error = next(statements, (None, None))
+
+      if lexer.error:
+         return None, lexer.error
+
+      if error:
+         return None, error
+
+      if node is None:
+         break
+
+      if profile is not None:
+         profile.count("nodes", count_nodes(node))
+         profile.count("statements")
+
+      if optimize:
+         with profile_phase(profile, "optimize"):
+            node = optimizer.visit(node)
+
+         stats["folded_nodes"] = optimizer.removed
+
+      with counted_output(profile):
+         if backend == "stack":
+            with profile_phase(profile, "resolve"):
+               code, stored = resolver.resolve(node)
+
+            with profile_phase(profile, "execute"):
+               value, error = evaluator.execute(code, stored)
+         elif backend == "compiled":
+            with profile_phase(profile, "compile"):
+               program = compiler.compile(node)
+
+            with profile_phase(profile, "execute"):
+               value, error = program(context)
+         else:
+            with profile_phase(profile, "execute"):
+               error = interpreter.visit(node, context).error
+
+      if error:
+         return None, error
+
+   if profile is not None:
+      profile.count("folded_nodes", optimizer.removed if optimize else 0)
+
+   return None, lexer.error
+
+def counted_tokens(tokens, profile):
+   for token in tokens:
+      profile.count("tokens")
+      yield token
+
+## Batch runner
+
+# Runs a lot of scripts in one go, spread over a pool of worker processes so startup is only paid once per worker
+# Every script gets its own symbol table and its output is captured, so scripts can't see or interleave with each other
+
+class BatchResult:
+   __slots__ = ("name", "output", "error", "elapsed")
+
+   def __init__(self, name, output, error, elapsed):
+      self.name = name
+      self.output = output
+      self.error = error # Already formatted, error objects hold the whole tree and don't need to cross processes
+      self.elapsed = elapsed
+
+def batch_files(paths):
+   files = []
+
+   for path in paths:
+      if os.path.isdir(path):
+         files.extend(sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(".su")))
+      else:
+         files.append(path)
+
+   return files
+
+def run_file(name, backend="interpreter", optimize=None, cache=True):
+   output = io.StringIO()
+   start = perf_counter()
+
+   try:
+      with open(name, "r") as file:
+         text = file.read()
+
+      with redirect_stdout(output):
+         result, error = run(name, text, backend=backend, optimize=optimize, cache=cache, symbol_table=new_symbol_table())
+
+      error = error.as_string() if error else None
+   except FileNotFoundError:
+      error = f"Error: File '{name}' not found."
+   except Exception as e:
+      error = f"Failed to interpret, error code: {e}"
+
+   return BatchResult(name, output.getvalue(), error, perf_counter() - start)
+
+def run_batch(paths, jobs=None, backend="interpreter", optimize=None, cache=True):
+   # Results come back in the order the files were given, whichever worker finishes first
+   files = batch_files(paths)
+   jobs = max(1, min(jobs or os.cpu_count() or 1, len(files)))
+
+   if jobs == 1:
+      for name in files:
+         yield run_file(name, backend, optimize, cache)
+
+      return
+
+   # Hand out files a few at a time, hundreds of tiny scripts would otherwise spend more time in the pool than running
+   chunk_size = max(1, len(files) // (jobs * 4))
+   count = len(files)
+
+   with ProcessPoolExecutor(max_workers=jobs) as executor:
+      yield from executor.map(run_file, files, [backend] * count, [optimize] * count, [cache] * count, chunksize=chunk_size)
@@ -1,41 +1,98 @@
+import argparse
 import sys
 import basic
+from time import perf_counter
+
+def run_batch(args):
+   # Returns the exit code, anything but 0 means at least one script didn't make it
+   start = perf_counter()
+   files = basic.batch_files(args.batch)
+   results = []
+   crashed = False
+
+   # Output is printed as soon as a script and everything before it are done, so the order never changes
+   try:
+      for result in basic.run_batch(files, jobs=args.jobs, backend=args.backend, optimize=args.optimize, cache=args.cache):
+         print(f"==> {result.name} <==")
+         print(result.output, end="")
+
+         if result.error:
+            print(result.error)
+
+         sys.stdout.flush()
+         results.append(result)
+   except Exception as e:
+      # A worker dying (BrokenProcessPool) lands here, the rest of the batch can't be trusted after that
+      print(f"==> {files[len(results)]} <==")
+      print(f"Failed to interpret, error code: {e}")
+      crashed = True
+
+   elapsed = perf_counter() - start
+   busy = sum(result.elapsed for result in results)
+   failed = sum(1 for result in results if result.error) + (len(files) - len(results) if crashed else 0)
+
+   for result in results:
+      print(f"{result.elapsed * 1000:10.2f} ms  {'error' if result.error else 'ok':>5}  {result.name}", file=sys.stderr)
+
+   print(f"{len(files)} files ({failed} failed) in {elapsed:.2f}s, {len(results) / elapsed if elapsed else 0:.1f} files/s, {busy:.2f}s spent in scripts", file=sys.stderr)
+   return 1 if failed else 0
 
 if __name__ == "__main__":
-   if len(sys.argv) != 2:
-      print("Usage: su <filename>")
-      sys.exit(1)
+   arguments = argparse.ArgumentParser(prog="su", usage="su <filename> [options]")
+   arguments.add_argument("filename", nargs="?")
+   arguments.add_argument("--backend", choices=basic.BACKENDS, default="interpreter", help="how the parsed program gets executed (compiled isn't faster for a single run, every statement runs once so compiling costs about what it saves)")
+   arguments.add_argument("--optimize", dest="optimize", action="store_true", default=None, help="fold literal arithmetic before running (the default only when the cache is used)")
+   arguments.add_argument("--no-optimize", dest="optimize", action="store_false", help="skip folding literal arithmetic before running")
+   arguments.add_argument("--fold-report", action="store_true", help="print how many nodes the optimizer removed")
+   arguments.add_argument("--no-cache", dest="cache", action="store_false", help="don't read or write the .suc cache next to the script")
+   arguments.add_argument("--cache-report", action="store_true", help="print whether the .suc cache was used")
+   arguments.add_argument("--stream", action="store_true", help="read and run the script one statement at a time (skips the cache)")
+   arguments.add_argument("--profile", nargs="?", const="text", choices=("text", "json"), help="print phase timings, counts and hot nodes/variables when done")
+   arguments.add_argument("--batch", nargs="+", metavar="PATH", help="run every .su file in these folders (or these files) with separate state")
+   arguments.add_argument("-j", "--jobs", type=int, help="worker processes for --batch (defaults to one per core)")
+   args = arguments.parse_args()
 
-   filename = sys.argv[1].strip()
+   if args.batch:
+      if args.filename or args.stream or args.profile:
+         arguments.error("--batch can't be combined with a filename, --stream or --profile")
+
+      sys.exit(run_batch(args))
+
+   if not args.filename:
+      arguments.error("a filename is required")
+
+   filename = args.filename.strip()
 
    if not filename.endswith(".su"):
       filename += ".su"
 
    try:
+      stats = {}
+      profile = basic.Profile() if args.profile else None
+
       with open(filename, 'r') as file:
-         content = file.read()
-      
-      lexer = basic.Lexer(filename, content)
-      tokens, error = lexer.make_tokens()
-      
+         if args.stream:
+            result, error = basic.run_stream(filename, file, backend=args.backend, optimize=bool(args.optimize), stats=stats, profile=profile)
+         else:
+            content = file.read()
+            result, error = basic.run(filename, content, backend=args.backend, optimize=args.optimize, cache=args.cache, stats=stats, profile=profile)
+
       if error:
          print(error.as_string())
-      else:
-         parser = basic.Parser(tokens)
-         ast = parser.parse()
-         
-         if ast.error:
-            print(ast.error.as_string())
+
+      if args.fold_report:
+         if "folded_nodes" in stats:
+            print(f"Optimizer removed {stats['folded_nodes']} nodes", file=sys.stderr)
          else:
-            interpreter = basic.Interpreter()
-            context = basic.Context("<Program>")
-            context.symbol_table = basic.global_symbol_table
-            result = interpreter.visit(ast.node, context)
-            
-            if result.error:
-               print(result.error.as_string())
+            print("Optimizer was off, nothing folded (see --optimize)", file=sys.stderr)
+
+      if args.cache_report and args.cache and not args.stream:
+         print(f"Cache {stats.get('cache', 'miss')}: {basic.cache_path(filename)}", file=sys.stderr)
+
+      if profile:
+         print(profile.as_json() if args.profile == "json" else profile.as_text(), file=sys.stderr)
 
    except FileNotFoundError:
       print(f"Error: File '{filename}' not found.")
    except Exception as e:
-      print(f"Failed to interpret, error code: {e}")
\ No newline at end of file
+      print(f"Failed to interpret, error code: {e}")